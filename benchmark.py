@@ -0,0 +1,314 @@
+"""
+Headless frame-throughput benchmarks for the game.
+
+Runs scripted scenarios with no frame cap and reports the frames per second and per-frame latency percentiles of
+each, so that regressions can be tracked between releases. Run from the repository root:
+
+    python benchmark.py [--frames 2000] [--scenario all_balls] [--threaded] [--capture FILE] [--no-trails]
+                        [--json results.json]
+    python benchmark.py --memory [--frames 100]
+
+where --memory instead reports how much memory each ball takes, and how much every frame allocates, at pool sizes from
+15 to 10,000 balls.
+"""
+from typing import *
+from random import choice
+import argparse
+import tracemalloc
+import json
+import time
+import gc
+
+import numpy as np
+import pygame
+
+from main import Game, DirtyRectManager, RenderQueue, AnimationCache, AssetManager, Profiler, ParticleSystem, CAT_TYPES
+
+
+def launch_balls(game: Game, quantity: int) -> None:
+    """
+    Sends off balls from the middle of the screen until the given number of balls are in play.
+    :param Game game: The game to launch the balls in
+    :param int quantity: How many balls should be in play
+    :return: None
+    """
+    while game.sprite_manager.active_count("Ball") < quantity:
+        ball = game.sprite_manager.acquire("Ball")
+        if ball is None:
+            break
+
+        ball.place(game.surface.get_width() // 2, game.surface.get_height() // 2)
+        ball.speed = ball.base_speed
+        ball.direction = (choice([-1, 1]), choice([-1, 1]))
+
+
+def setup_one_ball(game: Game) -> Callable[[int], None]:
+    game.skip_countdown()
+    return lambda frame: (launch_balls(game, 1), game.skip_countdown())
+
+
+def setup_all_balls(game: Game) -> Callable[[int], None]:
+    game.skip_countdown()
+    pool_size = len(game.sprite_manager.object_pool["Ball"])
+    return lambda frame: (launch_balls(game, pool_size), game.skip_countdown())
+
+
+def setup_all_cats(game: Game) -> Callable[[int], None]:
+    game.skip_countdown()
+    for cat_type in CAT_TYPES:
+        while game.activate_cat(cat_type) is not None:
+            pass
+
+    return lambda frame: (launch_balls(game, 1), game.skip_countdown())
+
+
+def setup_particles(game: Game) -> Callable[[int], None]:
+    game.skip_countdown()
+    rng = np.random.default_rng(0)
+
+    def before_frame(frame: int) -> None:
+        # keep about 10,000 particles alive, bursting from random points all over the screen
+        launch_balls(game, 1)
+        game.skip_countdown()
+        bursts = max(0, 10000 - ParticleSystem().count) // 40
+        width, height = game.surface.get_size()
+        ParticleSystem().emit_many("White Cat", rng.uniform(0, width, bursts).astype(np.float32),
+                                   rng.uniform(0, height, bursts).astype(np.float32))
+
+    return before_frame
+
+
+def setup_reset_cycles(game: Game) -> Callable[[int], None]:
+    played = 0
+
+    def before_frame(frame: int) -> None:
+        # after every couple of seconds worth of play, put every ball at the side it's heading for, so that they all
+        # score and the game resets and serves again as it would in play. The countdown after each reset is timed too.
+        nonlocal played
+        if game.sprite_manager.object_pool["Text"][1].message:
+            return
+
+        played += 1
+        if played % 120 == 0:
+            for ball in game.sprite_manager.active("Ball"):
+                ball.place(0 if ball.direction[0] < 0 else game.surface.get_width() - ball.rect.width, ball.rect.top)
+
+    return before_frame
+
+
+POOL_SIZES = [15, 100, 1000, 10000]
+
+SCENARIOS: Dict[str, Callable[[Game], Callable[[int], None]]] = {
+    "one_ball": setup_one_ball,
+    "all_balls": setup_all_balls,
+    "all_cats": setup_all_cats,
+    "particles": setup_particles,
+    "reset_cycles": setup_reset_cycles,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Gets a percentile from a list of sorted samples, using the nearest-rank method.
+    :param List[float] samples: Sorted samples
+    :param float fraction: The percentile to get, between 0 and 1
+    :return: float
+    """
+    return samples[min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))]
+
+
+def run_scenario(name: str, frames: int, resolution: Tuple[int, int], dirty_rects: bool = True,
+                 ball_count: int = 15, profile: bool = False, threaded: bool = False,
+                 capture: str = None, trails: bool = True) -> Dict[str, Any]:
+    """
+    Runs a scenario headless and uncapped, timing every frame.
+    :param str name: The name of the scenario in SCENARIOS
+    :param int frames: The number of frames to time
+    :param Tuple[int, int] resolution: The virtual resolution of the screen
+    :param bool dirty_rects: Whether to only update the changed areas of the display
+    :param int ball_count: The size of the ball pool
+    :param bool profile: Whether to also time each phase of the frames, which adds a little overhead
+    :param bool threaded: Whether to simulate each frame on its own thread while the one before it is drawn
+    :param str capture: If given, a file to stream every frame to, as Game's capture
+    :param bool trails: Whether balls leave trails
+    :return: Dict[str, Any], the results of the scenario
+    """
+    # game time advances a 60th of a second per frame, so countdowns and cat animations play out the same way every run
+    game = Game(headless=True, resolution=resolution, fps=0, dirty_rects=dirty_rects, ball_count=ball_count,
+                frame_ms=1000 / 60, threaded=threaded, capture=capture, trails=trails)
+    game.start()
+    Profiler().reset(enabled=profile, history=frames)
+    before_frame = SCENARIOS[name](game)
+
+    frame_times = []
+    coverage = 0.0
+    blits_calls = 0
+    for frame in range(frames):
+        before_frame(frame)
+        if frame % 10 in (0, 5):  # tap a control key, to time how long the game takes to show it
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN if frame % 10 == 0 else pygame.KEYUP, key=pygame.K_w))
+
+        start = time.perf_counter()
+        game.step()
+        frame_times.append((time.perf_counter() - start) * 1000)
+        coverage += DirtyRectManager().coverage
+        blits_calls += RenderQueue().calls
+
+    game.close()
+    total = sum(frame_times)
+    frame_times.sort()
+    results = {
+        "scenario": name,
+        "frames": frames,
+        "fps": frames / (total / 1000),
+        "mean_ms": total / frames,
+        "p50_ms": percentile(frame_times, 0.5),
+        "p95_ms": percentile(frame_times, 0.95),
+        "p99_ms": percentile(frame_times, 0.99),
+        "max_ms": frame_times[-1],
+        "screen_updated": coverage / frames,
+        "input_p50_ms": game.input_latency.get("p50_ms", 0.0),
+        "input_p95_ms": game.input_latency.get("p95_ms", 0.0),
+        **game.thread_times,
+    }
+    # how much of the simulation and the main thread's work happened at the same time, rather than one after the other
+    results["overlap_ms"] = max(0.0, results["simulation_ms"] + results["main_ms"] - results["mean_ms"])
+    results["counters"] = {
+        "blits_calls": blits_calls / frames,  # Surface.blits calls per frame, at most one per layer
+        "collapsed": RenderQueue().collapsed,  # erase and redraw pairs left out, for sprites that didn't change
+        "frame_cache_hits": AnimationCache().hits,
+        "frame_cache_misses": AnimationCache().misses,
+        "image_loads": AssetManager().loads,  # image files decoded, which an atlas brings down to 1
+        "image_bytes": AssetManager().used,
+        "pools": {label: game.sprite_manager.stats(label) for label in game.sprite_manager.object_pool},
+    }
+    if profile:
+        results["phases_ms"] = Profiler().averages()
+
+    if capture:
+        results["capture"] = game.capture.stats
+
+    return results
+
+
+def measure_memory(pool_size: int, frames: int) -> Dict[str, Any]:
+    """
+    Makes a game with a pool of balls, all in play, and measures the memory it takes and allocates per frame. Python
+    doesn't count allocations, so the allocations in a frame are measured by the most memory the frame used on top of
+    what the game held before it.
+    :param int pool_size: The size of the ball pool
+    :param int frames: The number of frames to measure
+    :return: Dict[str, Any], the game's memory, and its mean and max allocations per frame, in bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    game = Game(headless=True, fps=0, ball_count=pool_size, frame_ms=1000 / 60)
+    gc.collect()
+    game_bytes = tracemalloc.get_traced_memory()[0]
+
+    game.start()
+    before_frame = setup_all_balls(game)
+    for frame in range(30):  # let the caches fill up first
+        before_frame(frame)
+        game.step()
+
+    allocated = []
+    for frame in range(frames):
+        before_frame(frame)
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        game.step()
+        allocated.append(tracemalloc.get_traced_memory()[1] - start)
+
+    tracemalloc.stop()
+    return {"pool_size": pool_size, "game_bytes": game_bytes, "frame_bytes_mean": sum(allocated) / frames,
+            "frame_bytes_max": max(allocated)}
+
+
+def run_memory(frames: int) -> List[Dict[str, Any]]:
+    """
+    Measures memory at every pool size in POOL_SIZES. The memory per ball is worked out from the difference to a game
+    with a single ball, which cancels out everything else the game holds.
+    :param int frames: The number of frames to measure at each size
+    :return: List[Dict[str, Any]]
+    """
+    measure_memory(1, 10)  # the first game made also sets up things that last the whole process
+    baseline = measure_memory(1, frames)
+    results = []
+    for pool_size in POOL_SIZES:
+        result = measure_memory(pool_size, frames)
+        result["bytes_per_ball"] = (result["game_bytes"] - baseline["game_bytes"]) / (pool_size - 1)
+        results.append(result)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless frame-throughput benchmarks")
+    parser.add_argument("--frames", type=int, help="frames to time per scenario, 2000 by default, or 100 with --memory")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append", help="only run these scenarios")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1280, 720], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--full-updates", action="store_true", help="update the whole display every frame")
+    parser.add_argument("--balls", type=int, default=15, help="size of the ball pool, e.g. for mass-ball runs")
+    parser.add_argument("--profile", action="store_true", help="also break the frame time down by phase")
+    parser.add_argument("--threaded", action="store_true", help="simulate each frame on its own thread while the one "
+                                                                "before it is drawn")
+    parser.add_argument("--capture", metavar="FILE", help="also stream every frame to this file, e.g. /dev/null")
+    parser.add_argument("--no-trails", action="store_true", help="don't leave trails behind the balls")
+    parser.add_argument("--memory", action="store_true", help="measure memory per ball and per frame instead")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.memory:
+        results = run_memory(args.frames or 100)
+        print(f"{'balls':>8}{'bytes/ball':>12}{'KiB/frame':>12}{'max KiB':>10}")
+        for result in results:
+            print(f"{result['pool_size']:>8}{result['bytes_per_ball']:>12.0f}{result['frame_bytes_mean'] / 1024:>12.1f}"
+                  f"{result['frame_bytes_max'] / 1024:>10.1f}")
+
+        if args.json:
+            with open(args.json, "w") as file:
+                json.dump(results, file, indent=2)
+
+        return
+
+    results = [run_scenario(name, args.frames or 2000, tuple(args.resolution), not args.full_updates, args.balls,
+                            args.profile, args.threaded, args.capture, not args.no_trails) for name in args.scenario or SCENARIOS]
+
+    print(f"{'scenario':<14}{'fps':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'updated':>10}{'input p50':>11}{'input p95':>11}{'sim ms':>10}{'main ms':>10}{'overlap':>10}")
+    for result in results:
+        print(f"{result['scenario']:<14}{result['fps']:>10.1f}{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}"
+              f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['max_ms']:>10.3f}"
+              f"{result['screen_updated']:>10.1%}{result['input_p50_ms']:>11.3f}{result['input_p95_ms']:>11.3f}"
+              f"{result['simulation_ms']:>10.3f}{result['main_ms']:>10.3f}{result['overlap_ms']:>10.3f}")
+
+    for result in results:
+        counters = result["counters"]
+        lookups = counters["frame_cache_hits"] + counters["frame_cache_misses"]
+        balls = counters["pools"]["Ball"]
+        print(f"{result['scenario']}: {counters['blits_calls']:.1f} blits calls a frame, {counters['collapsed']} unchanged "
+              f"redraws left out, frame cache hit {counters['frame_cache_hits'] / max(lookups, 1):.1%} of {lookups}, "
+              f"{counters['image_loads']} image files loaded ({counters['image_bytes'] / 1024:.0f} KiB), "
+              f"at most {balls['high_water']} of {balls['capacity']} balls in play")
+
+    for result in results:
+        if "capture" in result:
+            capture = result["capture"]
+            print(f"{result['scenario']} capture: {capture['capture_ms']:.3f} ms per frame "
+                  f"({capture['capture_max_ms']:.3f} ms max), {capture['dropped']} dropped, {capture['stalls']} waits "
+                  f"for the writer ({capture['stall_ms']:.0f} ms), at most {capture['max_backlog']} frames waiting")
+
+    for result in results:
+        if "phases_ms" in result:
+            print(f"\n{result['scenario']} phases (mean ms per frame)")
+            for phase, ms in result["phases_ms"].items():
+                print(f"  {phase:<16}{ms:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
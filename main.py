@@ -2,11 +2,25 @@ from pygame.locals import *
 from pygame.font import Font
 from typing import *
 import pygame
-from datetime import datetime
-from random import choice, randrange
-from winsound import Beep
-from inspect import signature
+from random import Random
+from collections import OrderedDict, deque
 import itertools
+import threading
+import subprocess
+import shutil
+import queue
+import sys
+import weakref
+import math
+import hashlib
+import heapq
+import os
+import struct
+import argparse
+import csv
+import json
+import time
+import numpy as np
 
 pygame.init()
 FPS_CLOCK = pygame.time.Clock()
@@ -14,23 +28,187 @@ FPS = 60
 WHITE = (255, 255, 255)
 FADED_BLACK = (184, 184, 184)
 CAT_TYPES = ["Red", "Blue", "Green", "White", "Black"]
+INTERNAL_RESOLUTION = (1280, 720)  # the size the game is drawn at, which is then scaled to fill the display
+PHYSICS_STEP_MS = 1000 / 60  # the game's physics always advance by this much at a time, whatever the frame rate
+MAX_PHYSICS_STEPS = 5  # the most physics steps to catch up on in one frame, before dropping time instead
+RNG = Random()  # all of the game's randomness comes from here, so that seeding it makes a game reproducible
+# built by --build-atlas, and used instead of the separate images when it's there. It's kept out of git, since images
+# checked out after it was built get newer mtimes than it, which is how a stale atlas is spotted, but checking out
+# the atlas too would give it a newer mtime as well
+ATLAS_PATH = "Graphics/sprites.atlas"
+CAT_WEIGHTS = {"White": 35, "Red": 20, "Green": 20, "Blue": 20, "Black": 5}  # how likely each cat type is to spawn
+TONES = {"bat": (551, 16), "wall": (441, 16), "score": (600, 32)}  # name: (frequency in hertz, duration in ms)
+
+
+class Singleton(type):
+    """
+    Makes each class that uses it a singleton. The first call to the class makes its instance, and every call after
+    that gives back the same instance, without running __init__ again. Singletons are set up for each game by their
+    reset methods instead.
+    """
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls.__instance = None
+
+    def __call__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__call__(*args, **kwargs)
+
+        return cls.__instance
+
+
+class SoundManager(metaclass=Singleton):
+    """
+    Plays the game's sound effects without blocking the game loop. Every tone is synthesised into a buffer once, then
+    played through the mixer on a capped number of voices. The null backend is used when there's no audio device, or
+    the game is headless, and makes every sound a no-op.
+    """
+
+    def __init__(self):
+        self.__sounds: Dict[str, pygame.mixer.Sound] = {}
+        self.plays = 0
+        self.dropped = 0
+
+    def reset(self, backend: str = "mixer", max_voices: int = 4, sample_rate: int = 44100) -> None:
+        """
+        Sets up a backend and synthesises every tone in TONES for it.
+        :param str backend: Either "mixer" to play sounds through pygame's mixer, or "null" to stay silent
+        :param int max_voices: The most sounds that can play at once, after which new sounds are dropped
+        :param int sample_rate: The sample rate of the synthesised tones
+        :return: None
+        """
+        self.__sounds = {}
+        self.plays = 0
+        self.dropped = 0
+        if backend == "null":
+            return
+
+        try:
+            pygame.mixer.quit()
+            pygame.mixer.init(sample_rate, -16, 1, 256)  # a small buffer keeps the delay before a sound plays short
+
+        except pygame.error:  # no audio device, so fall back to the null backend
+            return
+
+        pygame.mixer.set_num_channels(max_voices)
+        sample_rate, _, channels = pygame.mixer.get_init()
+        for name, (frequency, duration) in TONES.items():
+            timeline = np.arange(sample_rate * duration // 1000) / sample_rate
+            # fade in and out over a millisecond, so the tones don't click
+            envelope = np.minimum(1, np.minimum(timeline, timeline[::-1]) * 1000)
+            samples = (np.sin(2 * np.pi * frequency * timeline) * envelope * 0.3 * 32767).astype(np.int16)
+            if channels > 1:
+                samples = np.repeat(samples[:, np.newaxis], channels, axis=1)
+
+            self.__sounds[name] = pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+
+    def play(self, name: str) -> None:
+        """
+        Starts playing a tone and returns straight away. If every voice is busy, the tone is dropped.
+        :param str name: The name of the tone in TONES
+        :return: None
+        """
+        sound = self.__sounds.get(name)
+        if sound is None:
+            return
+
+        channel = pygame.mixer.find_channel()
+        if channel is None:
+            self.dropped += 1
+            return
+
+        channel.play(sound)
+        self.plays += 1
 
 
 class SpriteManager:
+    """
+    Pools the game's objects by label. Each label has a free list and an active set, so objects can be acquired and
+    released in constant time, and per-frame work can iterate over just the active objects.
+    """
     __instance = None
 
     def __init__(self):
         self.__object_pool: Dict[str: List[object]] = {}
+        self.__free: Dict[str, List[Any]] = {}
+        self.__active: Dict[str, Dict[Any, None]] = {}  # insertion-ordered sets, so iterating them is deterministic
+        self.__factories: Dict[str, Tuple[Any, Tuple[Any, ...], Optional[str], Optional[int]]] = {}
+        self.__high_water: Dict[str, int] = {}
 
-    def add_objects(self, obj_label: str, obj, quantity: int = 1, *args) -> None:
+    def add_objects(self, obj_label: str, obj, quantity: int = 1, *args, grid_group: str = None,
+                    limit: int = None) -> None:
         """
         Creates an x amount of objects and adds it to the pool of objects
         :param str obj_label: The label to give to the object
         :param obj: The type of object to create
         :param int quantity: The number of objects to create
+        :param str grid_group: If given, the group in the spatial hash that active objects are tracked in, so that they
+        can be collided against.
+        :param int limit: The most objects the pool can grow to when acquiring, if more than quantity are needed. None
+        means the pool can grow without limit.
         :return: None
         """
         self.__object_pool[obj_label] = [obj(*args) for _ in range(quantity)]
+        self.__free[obj_label] = self.__object_pool[obj_label][::-1]  # reversed, so the first object is acquired first
+        self.__active[obj_label] = {}
+        self.__factories[obj_label] = (obj, args, grid_group, limit)
+        self.__high_water[obj_label] = 0
+
+    def acquire(self, obj_label: str) -> Optional[Any]:
+        """
+        Takes a free object out of a pool, making a new one if none are free and the pool can still grow.
+        :param str obj_label: The label of the pool
+        :return: The acquired object, or None if the pool is exhausted
+        """
+        obj, args, grid_group, limit = self.__factories[obj_label]
+        if self.__free[obj_label]:
+            new_object = self.__free[obj_label].pop()
+
+        elif limit is None or len(self.__object_pool[obj_label]) < limit:
+            new_object = obj(*args)
+            self.__object_pool[obj_label].append(new_object)
+
+        else:
+            return None
+
+        self.__active[obj_label][new_object] = None
+        self.__high_water[obj_label] = max(self.__high_water[obj_label], len(self.__active[obj_label]))
+        if grid_group is not None:
+            SpatialHash().insert(grid_group, new_object)
+
+        return new_object
+
+    def release(self, obj_label: str, released_object) -> None:
+        """
+        Returns an active object to its pool's free list.
+        :param str obj_label: The label of the pool
+        :param released_object: The object to release
+        :return: None
+        """
+        if self.__active[obj_label].pop(released_object, False) is None:
+            self.__free[obj_label].append(released_object)
+            if self.__factories[obj_label][2] is not None:
+                SpatialHash().remove(released_object)
+
+    def active(self, obj_label: str) -> Iterator:
+        """
+        Iterates over the active objects in a pool, in the order they were acquired.
+        :param str obj_label: The label of the pool
+        :return: Iterator
+        """
+        return iter(self.__active[obj_label])
+
+    def active_count(self, obj_label: str) -> int:
+        return len(self.__active[obj_label])
+
+    def stats(self, obj_label: str) -> Dict[str, int]:
+        """
+        Gets how big a pool is, how much of it is in use, and the most of it that has been in use at once.
+        :param str obj_label: The label of the pool
+        :return: Dict[str, int]
+        """
+        return {"capacity": len(self.__object_pool[obj_label]), "active": len(self.__active[obj_label]),
+                "high_water": self.__high_water[obj_label]}
 
     @property
     def object_pool(self):
@@ -43,66 +221,566 @@ class SpriteManager:
         return cls.__instance
 
 
-class ParticleSystem:
-    ...
+class ParticleSystem(metaclass=Singleton):
+    """
+    Sparks, bursts and trails. Every particle lives in preallocated arrays rather than as an object, so a frame's worth
+    of particles is updated with a handful of array operations, and drawn in a single batch of blits. Particles are
+    plain squares of a colour from the palette, which shrink as they age.
+    """
+    PALETTE = [(255, 190, 40), (255, 120, 0), (150, 150, 150), (220, 40, 40), (40, 80, 220), (40, 170, 60),
+               (200, 200, 200), (0, 0, 0)]
+    MAX_SIZE = 6
+    CELL_SIZE = 64  # the size of the grid cells that the screen updates for particles are rounded out to
+    MAX_TRAILS = 64  # the most balls that leave a trail at once, so that thousands of balls don't bury the screen
+    # name: (particles per emission, speed range in px per step, lifetime range in ms, starting size, drag, colours)
+    EMITTERS = {
+        "spark": (16, (1.5, 4.0), (150, 350), 3, 0.9, (0, 1)),
+        "trail": (1, (0.0, 0.3), (150, 250), 2, 1.0, (2,)),
+        "Red Cat": (40, (1.0, 5.0), (300, 700), 5, 0.93, (3, 1)),
+        "Blue Cat": (40, (1.0, 5.0), (300, 700), 5, 0.93, (4, 6)),
+        "Green Cat": (40, (1.0, 5.0), (300, 700), 5, 0.93, (5, 0)),
+        "White Cat": (40, (1.0, 5.0), (300, 700), 5, 0.93, (6, 2)),
+        "Black Cat": (40, (1.0, 5.0), (300, 700), 5, 0.93, (7, 2)),
+    }
+    FIELDS = X, Y, VEL_X, VEL_Y, LIFE, MAX_LIFE, START_SIZE, DRAG, COLOUR = range(9)
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, surface: Optional[pygame.Surface], capacity: int = 16384, seed: int = None,
+              trails: bool = True) -> None:
+        """
+        Removes every particle, and allocates room for a number of them, along with every array that emitting, updating
+        and drawing them works in, so that nothing is allocated per frame.
+        :param pygame.Surface surface: The surface the particles are drawn on
+        :param int capacity: The most particles that can be alive at once, after which emissions are cut short
+        :param int seed: The seed of the particles' randomness, which is kept apart from the game's
+        :param bool trails: Whether balls leave trails
+        :return: None
+        """
+        self.__surface = surface
+        self.__capacity = capacity
+        self.__trails = trails
+        # a column more than the capacity, which the particles that die are packed into when the live ones are packed
+        # into the spare copy of the state
+        self.__state = np.zeros((len(ParticleSystem.FIELDS), capacity + 1), np.float32)
+        self.__spare = np.zeros_like(self.__state)
+        self.__alive = np.zeros(capacity, bool)
+        self.__slots = np.zeros(capacity, np.intp)
+        self.__count = 0
+        self.__rng = np.random.default_rng(seed)
+        self.__drawn = np.zeros((3, capacity), np.int32)  # x, y and size of every particle, where it was last drawn
+        self.__drawn_count = 0
+        self.__drawn_areas: List[Rect] = []
+        self.__scratch_float = np.zeros((2, capacity), np.float32)
+        self.__scratch_int = np.zeros((2, capacity), np.int32)
+        self.__colours = {emitter: np.array(colours, np.float32)
+                          for emitter, (*_, colours) in ParticleSystem.EMITTERS.items()}
+        # a square for every colour and size, and white squares to erase them with, indexed by colour * MAX_SIZE + size
+        self.__squares: List[pygame.Surface] = []
+        for colour in ParticleSystem.PALETTE:
+            for size in range(1, ParticleSystem.MAX_SIZE + 1):
+                square = pygame.Surface((size, size))
+                square.fill(colour)
+                self.__squares.append(square)
+
+        self.__fillers = [AnimationCache().filler((size, size)) for size in range(1, ParticleSystem.MAX_SIZE + 1)]
+
+    def emit(self, emitter: str, x: float, y: float, count: int = None) -> None:
+        """
+        Emits a burst of particles from a point, in every direction.
+        :param str emitter: The name of the emitter in EMITTERS
+        :param float x: Where to emit from
+        :param float y: Where to emit from
+        :param int count: How many particles to emit, defaults to the emitter's
+        :return: None
+        """
+        self.emit_many(emitter, np.array([x], np.float32), np.array([y], np.float32), count)
+
+    def emit_many(self, emitter: str, xs: np.ndarray, ys: np.ndarray, count: int = None) -> None:
+        """
+        Emits a burst of particles from each of a number of points at once, e.g. a trail behind every ball.
+        :param str emitter: The name of the emitter in EMITTERS
+        :param np.ndarray xs: The points to emit from
+        :param np.ndarray ys: The points to emit from
+        :param int count: How many particles to emit from each point, defaults to the emitter's
+        :return: None
+        """
+        per_point, (min_speed, max_speed), (min_life, max_life), start_size, drag, _ = ParticleSystem.EMITTERS[emitter]
+        per_point = per_point if count is None else count
+        start = self.__count
+        new = min(len(xs) * per_point, self.__capacity - start)
+        if new <= 0:
+            return
+
+        # everything is worked out in place, in the new particles' columns and the scratch arrays
+        rng = self.__rng
+        x, y, vel_x, vel_y, life, max_life, size, particle_drag, colour = self.__state[:, start:start + new]
+        angle, speed = self.__scratch_float[:, :new]
+        whole = new // per_point  # the points that get every particle, which is all of them unless room runs out
+        x[:whole * per_point].reshape(whole, per_point)[:] = xs[:whole, None]
+        y[:whole * per_point].reshape(whole, per_point)[:] = ys[:whole, None]
+        if whole * per_point < new:
+            x[whole * per_point:], y[whole * per_point:] = xs[whole], ys[whole]
+
+        rng.random(dtype=np.float32, out=angle)
+        angle *= 2 * np.pi
+        rng.random(dtype=np.float32, out=speed)
+        speed *= max_speed - min_speed
+        speed += min_speed
+        np.multiply(np.cos(angle, out=vel_x), speed, out=vel_x)
+        np.multiply(np.sin(angle, out=vel_y), speed, out=vel_y)
+        rng.random(dtype=np.float32, out=life)
+        life *= max_life - min_life
+        life += min_life
+        max_life[:] = life
+        size[:] = start_size
+        particle_drag[:] = drag
+
+        colours = self.__colours[emitter]
+        if len(colours) == 1:
+            colour[:] = colours[0]
+
+        else:
+            picks = self.__slots[:new]
+            rng.random(dtype=np.float32, out=angle)
+            angle *= len(colours)
+            np.copyto(picks, angle, casting="unsafe")
+            np.take(colours, picks, out=colour, mode="clip")
+
+        self.__count += new
+
+    def emit_trails(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Emits a trail particle behind each of a number of balls, up to MAX_TRAILS of them, if trails are on.
+        :param np.ndarray xs: The centres of the balls
+        :param np.ndarray ys: The centres of the balls
+        :return: None
+        """
+        if self.__trails:
+            self.emit_many("trail", xs[:ParticleSystem.MAX_TRAILS], ys[:ParticleSystem.MAX_TRAILS])
+
+    def update(self, elapsed_ms: float) -> None:
+        """
+        Moves and ages every particle by a physics step, then removes the ones that have died.
+        :param float elapsed_ms: How long the step is
+        :return: None
+        """
+        count = self.__count
+        if not count:
+            return
+
+        x, y, vel_x, vel_y, life, _, _, drag, _ = self.__state[:, :count]
+        x += vel_x
+        y += vel_y
+        vel_x *= drag
+        vel_y *= drag
+        life -= elapsed_ms
+
+        alive = np.greater(life, 0, out=self.__alive[:count])
+        survivors = np.count_nonzero(alive)
+        if survivors < count:
+            # pack the survivors at the front of the spare state, so the live particles are always the first count.
+            # Each one's slot is the number of survivors up to and including it, less one, and the dead all go in the
+            # last column.
+            slots = self.__slots[:count]
+            np.copyto(slots, alive)  # summing the bools straight into the slots would allocate to cast them
+            np.cumsum(slots, out=slots)
+            slots -= 1
+            np.copyto(slots, self.__capacity, where=np.logical_not(alive, out=alive))
+            self.__spare[:, slots] = self.__state[:, :count]
+            self.__state, self.__spare = self.__spare, self.__state
+            self.__count = survivors
+
+    def draw(self) -> None:
+        """
+        Draws every live particle, and remembers where so that they can be erased.
+        :return: None
+        """
+        count = self.__count
+        self.__drawn_count = count
+        if not count:
+            return
+
+        x, y, _, _, life, max_life, start_size, _, colour = self.__state[:, :count]
+        drawn_x, drawn_y, drawn_size = self.__drawn[:, :count]
+        size, half, index = self.__scratch_float[0, :count], self.__scratch_int[0, :count], self.__scratch_int[1, :count]
+        # the particles shrink as they age, worked out in the scratch arrays so drawing doesn't allocate any new ones
+        np.divide(life, max_life, out=size)
+        np.multiply(size, start_size, out=size)
+        np.ceil(size, out=size)
+        np.clip(size, 1, ParticleSystem.MAX_SIZE, out=drawn_size, casting="unsafe")
+        np.right_shift(drawn_size, 1, out=half)
+        np.subtract(x, half, out=drawn_x, casting="unsafe")
+        np.subtract(y, half, out=drawn_y, casting="unsafe")
+        np.multiply(colour, ParticleSystem.MAX_SIZE, out=index, casting="unsafe")
+        np.add(index, drawn_size, out=index)
+        np.subtract(index, 1, out=index)
+
+        # one rect per occupied cell of a coarse grid keeps the dirty rect list short, however many particles there are
+        cell = ParticleSystem.CELL_SIZE
+        columns = self.__surface.get_width() // cell + 2
+        occupied = np.unique((drawn_y // cell + 1) * columns + drawn_x // cell + 1)
+        self.__drawn_areas = [Rect((column - 1) * cell, (row - 1) * cell, cell + ParticleSystem.MAX_SIZE,
+                                   cell + ParticleSystem.MAX_SIZE) for row, column in zip(*np.divmod(occupied, columns))]
+        squares = self.__squares
+        RenderQueue().draw_many(RenderQueue.PARTICLES, zip(map(squares.__getitem__, index.tolist()),
+                                                           zip(drawn_x.tolist(), drawn_y.tolist())), self.__drawn_areas)
+
+    def erase(self) -> None:
+        """
+        Erases every particle where it was last drawn.
+        :return: None
+        """
+        count = self.__drawn_count
+        if not count:
+            return
+
+        drawn_x, drawn_y, drawn_size = self.__drawn[:, :count]
+        fillers = self.__fillers
+        RenderQueue().draw_many(RenderQueue.ERASE_PARTICLES, zip(map(fillers.__getitem__, (drawn_size - 1).tolist()),
+                                                                 zip(drawn_x.tolist(), drawn_y.tolist())), self.__drawn_areas)
+        self.__drawn_count = 0
+
+    def clear(self) -> None:
+        """
+        Erases and removes every particle.
+        :return: None
+        """
+        self.erase()
+        self.__count = 0
+
+    @property
+    def count(self) -> int:
+        """
+        The number of live particles.
+        """
+        return self.__count
+
+    @property
+    def trails(self) -> bool:
+        return self.__trails
+
+
+class SpatialHash(metaclass=Singleton):
+    """
+    A uniform grid over the screen, which tracks which cells each sprite in a group overlaps. Collision checks then only
+    need to test the sprites sharing a cell, rather than every sprite in the group.
+    """
+
+    def __init__(self):
+        self.__cell_size = 32
+        self.__cells: Dict[str, Dict[Tuple[int, int], Set[Any]]] = {}
+        self.__members: Dict[str, Set[Any]] = {}
+        self.__spans: Dict[Any, Tuple[int, int, int, int]] = {}
+
+    def reset(self, cell_size: int = 32) -> None:
+        """
+        Removes every sprite from the grid.
+        :param int cell_size: The width and height of each cell, in pixels
+        :return: None
+        """
+        self.__cell_size = cell_size
+        self.__cells, self.__members, self.__spans = {}, {}, {}
+
+    def __span(self, rect: Rect) -> Tuple[int, int, int, int]:
+        """
+        Gets the range of cells a rect covers.
+        :param Rect rect: The rect to find the cells of
+        :return: Tuple[int, int, int, int], the first column, first row, last column and last row
+        """
+        if rect.width <= 0 or rect.height <= 0:  # empty rects never collide, so they don't belong in any cell
+            return 0, 0, -1, -1
+
+        return (rect.left // self.__cell_size, rect.top // self.__cell_size,
+                (rect.right - 1) // self.__cell_size, (rect.bottom - 1) // self.__cell_size)
+
+    def insert(self, group: str, sprite) -> None:
+        """
+        Starts tracking a sprite in a group.
+        :param str group: The group the sprite is collided against as part of
+        :param sprite: The sprite to track
+        :return: None
+        """
+        sprite.grid_group = group
+        self.__cells.setdefault(group, {})
+        self.__members.setdefault(group, set()).add(sprite)
+        self.__spans[sprite] = (0, 0, -1, -1)
+        self.move(sprite)
+
+    def remove(self, sprite) -> None:
+        """
+        Stops tracking a sprite.
+        :param sprite: The sprite to remove
+        :return: None
+        """
+        cells = self.__cells[sprite.grid_group]
+        span = self.__spans.pop(sprite)
+        for column in range(span[0], span[2] + 1):
+            for row in range(span[1], span[3] + 1):
+                cells[(column, row)].discard(sprite)
+
+        self.__members[sprite.grid_group].discard(sprite)
+        sprite.grid_group = None
+
+    def move(self, sprite) -> None:
+        """
+        Updates the cells a tracked sprite is in, after its rect has changed.
+        :param sprite: The sprite that has moved
+        :return: None
+        """
+        old_span = self.__spans[sprite]
+        new_span = self.__span(sprite.rect)
+        if new_span == old_span:
+            return
+
+        cells = self.__cells[sprite.grid_group]
+        for column in range(old_span[0], old_span[2] + 1):
+            for row in range(old_span[1], old_span[3] + 1):
+                cells[(column, row)].discard(sprite)
+
+        for column in range(new_span[0], new_span[2] + 1):
+            for row in range(new_span[1], new_span[3] + 1):
+                cells.setdefault((column, row), set()).add(sprite)
 
+        self.__spans[sprite] = new_span
+
+    def query(self, group: str, rect: Rect) -> Set[Any]:
+        """
+        Gets the sprites in a group that share a cell with a rect, and so may collide with it.
+        :param str group: The group to search
+        :param Rect rect: The area to search
+        :return: Set[Any]
+        """
+        cells = self.__cells.get(group, {})
+        span = self.__span(rect)
+        candidates = set()
+        for column in range(span[0], span[2] + 1):
+            for row in range(span[1], span[3] + 1):
+                candidates.update(cells.get((column, row), ()))
 
-class Particle:
-    def __init__(self, start_size: Tuple[int, int], duration: int):
-        self.__start_size = start_size
-        self.__duration = duration
+        return candidates
 
-    def update(self):
+    def near(self, groups: List[str], lefts: np.ndarray, tops: np.ndarray, rights: np.ndarray,
+             bottoms: np.ndarray) -> np.ndarray:
+        """
+        Finds which of a number of rects share a cell with a sprite in any of the groups, all at once. The cells in use
+        are counted into a summed-area table, so that each rect is checked against every cell it covers in a handful of
+        array operations, however many sprites there are.
+        :param List[str] groups: The groups to check against
+        :param np.ndarray lefts: The left of each rect
+        :param np.ndarray tops: The top of each rect
+        :param np.ndarray rights: The right of each rect, as in Rect.right
+        :param np.ndarray bottoms: The bottom of each rect, as in Rect.bottom
+        :return: np.ndarray, whether each rect shares a cell with a sprite
         """
-        Updates the size, colour, and position of the ...
+        used = [cell for group in groups for cell, sprites in self.__cells.get(group, {}).items() if sprites]
+        if not used:
+            return np.zeros(len(lefts), bool)
+
+        used = np.array(used, np.int64)
+        (first_column, first_row), (last_column, last_row) = used.min(axis=0), used.max(axis=0)
+        # the table only covers the cells from the first in use to the last, and a rect's span is cut down to those
+        table = np.zeros((last_row - first_row + 2, last_column - first_column + 2), np.int64)
+        table[used[:, 1] - first_row + 1, used[:, 0] - first_column + 1] = 1
+        table.cumsum(axis=0, out=table)
+        table.cumsum(axis=1, out=table)
+
+        cell_size = self.__cell_size
+        columns_from = np.maximum(lefts // cell_size, first_column) - first_column
+        rows_from = np.maximum(tops // cell_size, first_row) - first_row
+        columns_to = np.minimum((rights - 1) // cell_size, last_column) - first_column + 1
+        rows_to = np.minimum((bottoms - 1) // cell_size, last_row) - first_row + 1
+        # empty rects never collide, and rects outside the cells in use have nothing in them
+        inside = (rights > lefts) & (bottoms > tops) & (columns_from < columns_to) & (rows_from < rows_to)
+        columns_from, rows_from = columns_from[inside], rows_from[inside]
+        columns_to, rows_to = columns_to[inside], rows_to[inside]
+        near = np.zeros(len(lefts), bool)
+        near[inside] = (table[rows_to, columns_to] - table[rows_from, columns_to] - table[rows_to, columns_from] +
+                        table[rows_from, columns_from]) > 0
+        return near
+
+    def first_sweep(self, start: Rect, end: Rect, pool: List[Any],
+                    mask: pygame.mask.Mask = None) -> Optional[Tuple[Any, float, int]]:
         """
-        ...
+        Finds the sprite in a pool that a rect moving from start to end hits first.
+        :param Rect start: Where the rect was before moving
+        :param Rect end: Where the rect has moved to
+        :param List[Any] pool: The sprites to check against, in the order they were created
+        :param pygame.mask.Mask mask: If given, the mask of what's moving, and sprites only count as hit once their masks
+        overlap, rather than as soon as their rects do
+        :return: Optional[Tuple[Any, float, int]], the sprite hit first, and the time and axis of the hit, as given by
+        CollisionManager.sweep. Ties go to the sprite made earliest.
+        """
+        group = getattr(pool[0], "grid_group", None) if pool else None
+        if group is None or len(self.__members[group]) != len(pool):
+            candidates = pool
+
+        else:
+            candidates = self.query(group, start.union(end))
+
+        hits = [(hit[0], sprite.uid, sprite, hit[1]) for sprite in candidates
+                if (hit := CollisionManager.sweep(start, end, sprite.rect)) is not None]
+        if mask is not None:  # the rects are only a quick first check, so follow each hit in to where the pixels meet
+            hits = [(time_of_impact, uid, sprite, axis) for entry, uid, sprite, axis in hits
+                    if (time_of_impact := CollisionManager.mask_sweep(start, end, entry, mask, sprite)) is not None]
+
+        if not hits:
+            return None
+
+        time_of_impact, _, sprite, axis = min(hits, key=lambda hit: hit[:2])
+        return sprite, time_of_impact, axis
 
 
 class CollisionManager:
+    PRECISE_BATS = False  # whether balls hitting bats are checked pixel by pixel like cats, rather than by their rects
+
     @staticmethod
-    def check_bat_ball(bat_pool: List[Any], ball_pool: List[Any]) -> None:
+    def sweep(start: Rect, end: Rect, target: Rect) -> Optional[Tuple[float, int]]:
         """
-        Checks the collisions between a bat pool and a ball pool.
-        :param List[Any] bat_pool: a list of Bat objects
-        :param List[Any] ball_pool: a list of Ball objects to compare against
-        :return: None
+        Swept AABB test of a rect moving in a straight line from start to end, against a stationary target.
+        :param Rect start: Where the moving rect was before moving
+        :param Rect end: Where the moving rect has moved to
+        :param Rect target: The rect to check against
+        :return: Optional[Tuple[float, int]], None if they never collide. Otherwise, the fraction of the movement made
+        before they touch, and the axis of the face that's hit: 0 for x, 1 for y, or -1 if they overlapped at the start.
+        """
+        if target.width <= 0 or target.height <= 0:
+            return None
+
+        if start.colliderect(target):
+            return 0.0, -1
+
+        entries, exits = [], []
+        for distance, low, high, target_low, target_high in ((end.x - start.x, start.left, start.right, target.left, target.right),
+                                                             (end.y - start.y, start.top, start.bottom, target.top, target.bottom)):
+            if distance > 0:
+                entries.append((target_low - high) / distance)
+                exits.append((target_high - low) / distance)
+
+            elif distance < 0:
+                entries.append((target_high - low) / distance)
+                exits.append((target_low - high) / distance)
+
+            elif high <= target_low or low >= target_high:  # not moving on this axis, and not lined up with the target
+                return None
+
+            else:
+                entries.append(float("-inf"))
+                exits.append(float("inf"))
+
+        entry, exit_time = max(entries), min(exits)
+        if entry >= exit_time or entry < 0 or entry >= 1:  # rects that only end up touching haven't collided
+            return None
+
+        return entry, 0 if entries[0] >= entries[1] else 1
+
+    @staticmethod
+    def mask_sweep(start: Rect, end: Rect, entry: float, mask: pygame.mask.Mask, target) -> Optional[float]:
         """
-        # get a list of bats and balls that have collided with each other
-        collisions = [(bat_pool[ball.rect.collidelist(bat_pool)], ball) for ball in ball_pool if ball.rect.collidelist(bat_pool) != -1]
-        for collision in collisions:  # iterate through each collision.
-            if collision[0].rect.colliderect(Rect(collision[1].prev_rect[0], collision[1].prev_rect[1] + collision[1].velocity[1], collision[1].prev_rect[2], collision[1].prev_rect[3])):
-                # moves the ball to either side of the bat depending on the direction, then moves the ball a suitable
-                # distance away from the top or bottom of the bat depending on the direction of the ball
-                inverse_y = -collision[1].direction[1] if collision[1].direction[1] != collision[0].direction[0] else collision[1].direction[1]
-                collision[1].move_pos(collision[0].rect.left - collision[1].rect.right if collision[1].direction[0] < 0 else collision[0].rect.right - collision[1].rect.left, (min((collision[0].rect.bottom - collision[1].rect.top), abs(collision[0].rect.top - collision[1].rect.bottom)) * inverse_y))
-                collision[1].direction = (collision[1].direction[0], inverse_y)
+        Follows a rect moving from start to end a pixel at a time, from when it first touches a sprite's rect, until its
+        mask overlaps the sprite's mask.
+        :param Rect start: Where the moving rect was before moving
+        :param Rect end: Where the moving rect has moved to
+        :param float entry: The fraction of the movement made before the rects touch, as given by sweep
+        :param pygame.mask.Mask mask: The mask of what's moving
+        :param target: The sprite to check against
+        :return: Optional[float], None if the masks never overlap, otherwise the fraction of the movement made before
+        they do
+        """
+        target_mask, target_left, target_top = target.mask, target.rect.left, target.rect.top
+        distance_x, distance_y = end.x - start.x, end.y - start.y
+        steps = max(abs(distance_x), abs(distance_y), 1)
+        for step in range(math.floor(entry * steps), steps + 1):
+            left, top = start.x + round(distance_x * step / steps), start.y + round(distance_y * step / steps)
+            if target_mask.overlap(mask, (left - target_left, top - target_top)) is not None:
+                return max(entry, step / steps)
 
-            # check if the previous rect of the ball with a modified x collides with the bat.
-            elif collision[0].rect.colliderect(Rect(collision[1].prev_rect[0] + collision[1].velocity[0], collision[1].prev_rect[1], collision[1].prev_rect[2], collision[1].prev_rect[3])):
-                # set ball position on the edge of the bat
-                collision[1].move_pos(collision[0].rect.right - collision[1].rect.left if collision[1].direction[0] < 0 else collision[0].rect.left - collision[1].rect.right, 0, False)
-                collision[1].direction = (-collision[1].direction[0], collision[1].direction[1])  # changes direction
+        return None
 
-            Beep(551, 16)
-            collision[1].speed += 1
+    @staticmethod
+    def check_bat_ball(bat_pool: List[Any], ball_pool: List[Any]) -> int:
+        """
+        Checks the collisions between the bats and a ball pool, by sweeping each ball from where it was at the start
+        of the physics step to where it is now, so that fast balls can't pass through a bat.
+        :param List[Any] bat_pool: a list of every Bat object
+        :param List[Any] ball_pool: a list of Ball objects to compare against
+        :return: int, the number of balls that hit a bat
+        """
+        hits = 0
+        spatial_hash = SpatialHash()
+        candidates = BallEngine().near(["Bat"]) if BallEngine().owns(ball_pool) else ball_pool
+        for ball in candidates:
+            if ball.direction == (0, 0):  # balls out of play can't be hit
+                continue
+
+            start, end = ball.prev_rect, ball.rect
+            hit = spatial_hash.first_sweep(start, end, bat_pool, ball.mask if CollisionManager.PRECISE_BATS else None)
+            if hit is None:
+                continue
+
+            bat, time_of_impact, axis = hit
+            left = start.left + round((end.left - start.left) * time_of_impact)
+            top = start.top + round((end.top - start.top) * time_of_impact)
+            if axis == 0:  # hit the front or back of the bat, so bounce back the way it came
+                left = bat.rect.left - start.width if end.left > start.left else bat.rect.right
+                ball.direction = (-ball.direction[0], ball.direction[1])
+
+            elif axis == 1:  # hit the top or bottom of the bat
+                top = bat.rect.top - start.height if end.top > start.top else bat.rect.bottom
+                ball.direction = (ball.direction[0], -ball.direction[1])
+
+            else:  # the bat moved into the ball, so push the ball out of whichever side is closest
+                push_outs = [(start.right - bat.rect.left, 0, -1), (bat.rect.right - start.left, 0, 1),
+                             (start.bottom - bat.rect.top, 1, -1), (bat.rect.bottom - start.top, 1, 1)]
+                distance, push_axis, push_direction = min(push_outs)
+                if push_axis == 0:
+                    left = start.left + distance * push_direction
+                    ball.direction = (push_direction, ball.direction[1])
+
+                else:
+                    top = start.top + distance * push_direction
+                    ball.direction = (ball.direction[0], push_direction)
+
+            ball.move_to(left, top)
+            ParticleSystem().emit("spark", ball.rect.centerx, ball.rect.centery)
+            SoundManager().play("bat")
+            ball.speed += 1
+            hits += 1
+
+        return hits
 
     @staticmethod
-    def check_ball_cat(ball_pool: List[Any], cat_pool: List[Any], bat_pool: List[Any] = None) -> None:
+    def check_ball_cat(ball_pool: List[Any], cat_pool: List[Any], sprite_manager: SpriteManager) -> List[str]:
         """
         Checks the collisions between all the balls and all the cats on the screen.
         :param List[Any] ball_pool: A list of Ball objects
-        :param List[Any] cat_pool: A list of Cat objects
-        :param List[Any] bat_pool: A list of bat objects
-        :return: None
+        :param List[Any] cat_pool: A list of the active Cat objects
+        :param SpriteManager sprite_manager: Where to acquire extra balls from
+        :return: List[str], the types of the cats that were hit
         """
-        collisions = [(cat_pool[ball.rect.collidelist(cat_pool)], ball) for ball in ball_pool if ball.rect.collidelist(cat_pool) != -1 and cat_pool[ball.rect.collidelist(cat_pool)].rotation % 360 != 0]
+        spatial_hash = SpatialHash()
+        candidates = BallEngine().near(["Cat"]) if BallEngine().owns(ball_pool) else ball_pool
+        # sweep each ball over its last physics step, so fast balls can't skip over a cat, and only count hits on the
+        # cat itself, rather than on the transparent corners of its rotated rect
+        hits = {}
+        for ball in candidates:
+            hit = spatial_hash.first_sweep(ball.prev_rect, ball.rect, cat_pool, ball.mask)
+            if hit is not None and hit[0].rotation % 360 != 0:
+                hits.setdefault(hit[0], (hit[0], ball))  # the first hit resets the cat, so any others this step miss it
+
+        collisions = list(hits.values())
         for collision in collisions:
+            ParticleSystem().emit(collision[0].cat_type, collision[0].rect.centerx, collision[0].rect.centery)
             match collision[0].cat_type:
                 case "White Cat":
-                    for inactive_ball in list(filter(lambda x: x.direction == (0, 0), ball_pool))[:2]:
-                        inactive_ball.direction = (choice([-1, 1]), choice([-1, 1]))
-                        inactive_ball.move_pos(collision[1].rect.left - inactive_ball.rect.left, collision[1].rect.top - inactive_ball.rect.top)
+                    for _ in range(2):
+                        inactive_ball = sprite_manager.acquire("Ball")
+                        if inactive_ball is None:  # every ball is already in play
+                            break
+
+                        inactive_ball.direction = (RNG.choice([-1, 1]), RNG.choice([-1, 1]))
+                        inactive_ball.place(collision[1].rect.left, collision[1].rect.top)
 
                 case "Red Cat":
                     print("\033[31mRed Cat hit\033[0m")
@@ -118,344 +796,1960 @@ class CollisionManager:
 
             collision[0].reset()
 
+        return [collision[0].cat_type for collision in collisions]
 
-class Text:
-    def __init__(self, *args):
-        self._surface: pygame.Surface = args[0]
-        self._message: str = args[1]
-        self._font_dir: str = args[2]
-        self._size: int = args[3]
-        self._pos: Tuple[int, int] = args[4]
-        self._color: Tuple[int, int, int] = args[5]
-        self._font_surf: pygame.Surface = Font(args[2], args[3]).render(args[1], False, args[5]).convert_alpha(args[0])
 
-    def update_text(self, new_message: str, centralise: bool = False) -> None:
+class DirtyRectManager(metaclass=Singleton):
+    """
+    Collects the areas of the screen that have been drawn on during a frame, so that only those areas need to be
+    pushed to the display.
+    """
+
+    def __init__(self):
+        self.__rects: List[Rect] = []
+        self.__screen_rect = Rect(0, 0, 1, 1)
+        self.__screen_area = 1
+        self.__coverage = 0.0
+        self.enabled = True
+
+    def reset(self, screen: pygame.Surface, enabled: bool = True) -> None:
         """
-        Updates the text in the currently displayed text surface
-        :param str new_message: The new message
-        :param bool centralise: Whether we need to centralise the text around the given position
+        Forgets any collected rects and starts tracking a new screen.
+        :param pygame.Surface screen: The display surface
+        :param bool enabled: Whether to update dirty rects only, or fall back to updating the full screen every frame
         :return: None
         """
-        self._font_surf.fill(WHITE)
-        # if it was centralised before, good chance it will be again.
-        self.draw(mod_x=(-self._font_surf.get_rect().centerx if centralise else 0))
+        self.__rects = []
+        self.__screen_rect = screen.get_rect()
+        self.__screen_area = max(1, screen.get_width() * screen.get_height())
+        self.__coverage = 0.0
+        self.enabled = enabled
 
-        self._font_surf = Font(self._font_dir, self._size).render(new_message, False, self._color).\
-            convert_alpha(self._surface)
-        self._message = new_message
-        self.draw(mod_x=(-self._font_surf.get_rect().centerx if centralise else 0))
+    def add(self, rect: Rect) -> None:
+        """
+        Marks an area of the screen as changed this frame.
+        :param Rect rect: The area that has been drawn on, as returned by Surface.blit or Surface.fill
+        :return: None
+        """
+        if rect.width and rect.height:
+            self.__rects.append(rect)
 
-    def draw(self, mod_x: int = 0, mod_y: int = 0) -> None:
+    def extend(self, rects: Iterable[Rect]) -> None:
         """
-        Blits the text onto the screen
+        Marks several areas of the screen as changed this frame, e.g. the rects returned by Surface.blits.
+        :param Iterable[Rect] rects: The areas that have been drawn on
         :return: None
         """
-        screen_pos = (
-            mod_x + (self._surface.get_width() + self._pos[0] - self._font_surf.get_width() if self._pos[0] < 0 else self._pos[0]),
-            mod_y + (self._surface.get_height() + self._pos[1] - self._font_surf.get_height() if self._pos[1] < 0 else self._pos[1])
-        )
-        self._surface.blit(self._font_surf, screen_pos)
+        self.__rects.extend(rects)
 
-    @property
-    def pos(self):
-        return self._pos
+    def flush(self) -> List[Rect]:
+        """
+        Gets all the rects collected this frame, then starts collecting for the next frame.
+        :return: List[Rect]
+        """
+        rects = self.__rects
+        self.__coverage = min(1.0, sum(rect.width * rect.height for rect in rects) / self.__screen_area)
+        self.__rects = []
+        return rects
 
-    @pos.setter
-    def pos(self, new_pos):
-        self._pos = new_pos
+    def present(self) -> List[Rect]:
+        """
+        Pushes this frame's changes to the display, either just the dirty rects or the whole screen.
+        :return: List[Rect], the areas of the display that were updated
+        """
+        rects = self.flush()
+        if self.enabled:
+            pygame.display.update(rects)
+            return rects
+
+        self.__coverage = 1.0
+        pygame.display.update()
+        return [Rect(self.__screen_rect)]
 
     @property
-    def color(self):
-        return self._color
+    def coverage(self) -> float:
+        """
+        The fraction of the screen updated during the last frame. Overlapping rects are counted more than once, so this
+        is an upper bound.
+        """
+        return self.__coverage
 
-    @color.setter
-    def color(self, new_color: Union[Tuple[int, int, int], Tuple[int, int, int, int]]):
-        self._color = new_color
 
-    @property
-    def size(self):
-        return self._size
+class RenderQueue(metaclass=Singleton):
+    """
+    Collects everything drawn during a frame as blit commands, then draws them all at the end of the frame a layer at a
+    time, with a single Surface.blits call per layer. Every erase is a layer of its own, drawn before anything else, so
+    the order things are drawn in no longer depends on the order the game happened to get to them in.
 
-    @size.setter
-    def size(self, new_size: int):
-        self._size = new_size
-        self._font_surf = Font(self._font_dir, new_size).render(self._message, False, self.color). \
-            convert_alpha(self._surface)
+    The commands for a frame can also be taken out of the queue as an immutable snapshot, and drawn later, so that the
+    next frame can be simulated on another thread while the last one is drawn.
+    """
+    LAYERS = ERASE, ERASE_PARTICLES, CATS, TEXT, BALLS, BATS, PARTICLES, OVERLAY = range(8)
+    # whether drawing on each layer could cover something else that needs drawing again, which text and the overlay
+    # can't, since they're drawn on top of white
+    DAMAGES = (True, True, True, False, True, True, True, False)
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, surface: Optional[pygame.Surface]) -> None:
+        """
+        Throws away every queued command, and starts drawing onto a new surface.
+        :param pygame.Surface surface: The surface to draw on
+        :return: None
+        """
+        self.__surface = surface
+        # each layer is a list of batches of (image, top left) pairs, chained together when the layer is drawn
+        self.__layers: List[List[Iterable[Tuple[pygame.Surface, Any]]]] = [[] for _ in RenderQueue.LAYERS]
+        self.__areas: List[List[Rect]] = [[] for _ in RenderQueue.LAYERS]  # the screen area each layer covers
+        # commands queued by draw and erase, as (layer, image, rect, the rect as a tuple)
+        self.__singles: List[Tuple[int, pygame.Surface, Rect, Tuple[int, int, int, int]]] = []
+        self.__tops: Dict[Tuple[int, int], int] = {}  # top left: the index of the last single drawn there
+        self.__drawn: Dict[Tuple[int, int, int, int], pygame.Surface] = {}  # rect: what was left drawn there
+        self.__damage: List[Rect] = []  # the areas the last snapshot draws over, which could cover something else
+        self.__calls = 0
+        self.__collapsed = 0
+
+    def draw(self, layer: int, image: pygame.Surface, dest: Union[Rect, Tuple[int, int]]) -> None:
+        """
+        Queues an image to be drawn at the end of the frame.
+        :param int layer: The layer to draw it on, from LAYERS
+        :param pygame.Surface image: The image to draw
+        :param dest: Where to draw the top left of the image
+        :return: None
+        """
+        area = (dest[0], dest[1], image.get_width(), image.get_height())
+        self.__tops[area[:2]] = len(self.__singles)
+        self.__singles.append((layer, image, Rect(area), area))
+
+    def erase(self, rect: Rect, filler_surf: pygame.Surface = None) -> None:
+        """
+        Queues an area of the screen to be cleared at the start of drawing the frame.
+        :param Rect rect: The area to clear
+        :param pygame.Surface filler_surf: A white surface the size of the area, if the caller already has one
+        :return: None
+        """
+        if rect.width and rect.height:
+            # erases go on before any drawing, so a draw queued earlier that this covers is dropped, just as the erase
+            # would have wiped it out if it had been drawn straight away. Sprites erase themselves from the top left
+            # they were drawn at, which is the only place that needs looking.
+            drawn = self.__tops.pop(rect.topleft, None)
+            if drawn is not None and self.__singles[drawn] is not None and rect.contains(self.__singles[drawn][2]):
+                self.__singles[drawn] = None
+
+            self.__singles.append((RenderQueue.ERASE, filler_surf or AnimationCache().filler(rect.size), Rect(rect),
+                                   tuple(rect)))
+
+    def draw_many(self, layer: int, blits: Iterable[Tuple[pygame.Surface, Tuple[int, int]]], areas: List[Rect]) -> None:
+        """
+        Queues a batch of images to be drawn at the end of the frame, e.g. every ball or particle at once.
+        :param int layer: The layer to draw them on, from LAYERS
+        :param blits: (image, top left) pairs, in the form Surface.blits takes, which are only read when the layer is
+        drawn, so nothing they're read from can change after they're queued
+        :param List[Rect] areas: Rects covering everywhere the batch draws, which can be coarser than the images
+        :return: None
+        """
+        self.__layers[layer].append(blits)
+        self.__areas[layer].extend(areas)
+
+    def __collapse(self) -> None:
+        """
+        Moves the draw and erase commands into their layers, leaving out exact repeats, and erase and redraw pairs that
+        would put back exactly what was there before, e.g. a bat that hasn't moved.
+        :return: None
+        """
+        singles = [single for single in self.__singles if single is not None]
+        self.__singles, self.__tops = [], {}
+        # of the repeats, the last one is kept, so it still goes on top of whatever was queued between them
+        singles = list({(single[0], id(single[1]), single[3]): single for single in reversed(singles)}.values())[::-1]
+        erased = {area for layer, _, _, area in singles if layer == RenderQueue.ERASE}
+        unchanged = [single for single in singles if single[0] != RenderQueue.ERASE and single[3] in erased and
+                     self.__drawn.get(single[3]) is single[1]]
+        drawn = {}
+        if unchanged:
+            areas = [single[2] for single in singles] + [area for layer_areas in self.__areas for area in layer_areas]
+            for single in unchanged:
+                # the rect's own erase and draw always overlap it, so anything more means something else changed there
+                if len(single[2].collidelistall(areas)) == 2:
+                    singles.remove(single)
+                    singles.remove(next(erase for erase in singles if erase[0] == RenderQueue.ERASE and erase[3] == single[3]))
+                    drawn[single[3]] = single[1]
+                    self.__collapsed += 1
+
+        for layer, image, rect, area in singles:
+            self.__layers[layer].append(((image, rect),))
+            self.__areas[layer].append(rect)
+            if layer != RenderQueue.ERASE:
+                drawn[area] = image
+
+        # only what's been drawn, or kept, this frame is known to still be there next frame
+        self.__drawn = drawn
+
+    def snapshot(self) -> Tuple[Tuple[int, Iterable[Tuple[pygame.Surface, Any]], Tuple[Rect, ...]], ...]:
+        """
+        Takes every queued command out of the queue, ready for the next frame to be queued.
+        :return: Tuple[Tuple[int, Iterable[Tuple[pygame.Surface, Any]], Tuple[Rect, ...]], ...], the layer, blits and
+        areas of every layer with something to draw, in the order to draw them, which can only be drawn once. Nothing in
+        it is read from the sprites again, so it can be drawn while they move on.
+        """
+        self.__collapse()
+        snapshot = tuple([(layer, itertools.chain.from_iterable(batches), tuple(self.__areas[layer]))
+                          for layer, batches in enumerate(self.__layers) if batches])
+        self.__damage = [area for layer, _, areas in snapshot if RenderQueue.DAMAGES[layer] for area in areas]
+        self.__layers, self.__areas = [[] for _ in RenderQueue.LAYERS], [[] for _ in RenderQueue.LAYERS]
+        return snapshot
+
+    def flush(self, snapshot: Tuple[Tuple[int, Iterable[Tuple[pygame.Surface, Any]], Tuple[Rect, ...]], ...] = None) -> None:
+        """
+        Draws a snapshot, a layer at a time, and marks the areas drawn on as dirty.
+        :param snapshot: The snapshot to draw, as taken by snapshot, otherwise everything queued is drawn
+        :return: None
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        self.__calls = 0
+        for layer, blits, areas in snapshot:
+            self.__surface.blits(blits, False)
+            DirtyRectManager().extend(areas)
+            self.__calls += 1
+
+    def was_damaged(self, rect: Rect) -> bool:
+        """
+        Checks whether an area of the screen was drawn over in the last snapshot, and so might need drawing again.
+        :param Rect rect: The area to check
+        :return: bool
+        """
+        return rect.collidelist(self.__damage) != -1
 
     @property
-    def surface(self) -> pygame.Surface:
-        return self._font_surf
+    def calls(self) -> int:
+        """
+        The number of calls to Surface.blits the last flush made, which is at most one per layer.
+        """
+        return self.__calls
 
     @property
-    def message(self):
-        return self._message
+    def collapsed(self) -> int:
+        """
+        The number of erase and redraw pairs left out since the queue was reset.
+        """
+        return self.__collapsed
 
 
-class Sprite:
-    def __init__(self, *args):
-        self._surface: pygame.Surface = args[0]
-        self._image: pygame.Surface = pygame.image.load(args[1][0]).convert_alpha(args[0])
-        self._filler_surf = self._image.copy()
-        self._filler_surf.fill(WHITE)
+class TextCache(metaclass=Singleton):
+    """
+    Caches the fonts and rendered text surfaces used by Text objects, so that a string only gets rendered again when
+    its message, size or colour changes.
+    """
 
-        self._image_outline = args[1][1]
-        if args[1][1]:
-            self._image_outline = pygame.image.load(args[1][1]).convert_alpha(args[0])
+    def __init__(self, max_surfaces: int = 256):
+        self.__fonts: Dict[Tuple[str, int], Font] = {}
+        self.__surfaces: OrderedDict[Tuple[str, str, int, Tuple[int, ...]], pygame.Surface] = OrderedDict()
+        self.__max_surfaces = max_surfaces
 
-        self._rect = Rect(args[2][0], args[2][1], self._image.get_width(), self._image.get_height())
-        self._prev_rect = self._rect
-        self._direction = (0, 0)
-        self._base_speed = 0
-        self._speed = 0
+    def font(self, font_dir: str, size: int) -> Font:
+        """
+        Gets a font, only loading it from disk the first time it's asked for.
+        :param str font_dir: The path to the font file
+        :param int size: The size of the font
+        :return: Font
+        """
+        key = (font_dir, size)
+        if key not in self.__fonts:
+            self.__fonts[key] = Font(font_dir, size)
 
-    def move_pos(self, x: int, y: int, update_prev_rect: bool = True) -> None:
+        return self.__fonts[key]
+
+    def render(self, target: pygame.Surface, font_dir: str, message: str, size: int, color: Tuple[int, ...]) -> pygame.Surface:
         """
-        Moves the position of where the object is drawn on the screen
-        :param int x: x modifier
-        :param int y: y modifier
-        :param bool update_prev_rect: Whether we change the previous rect during a movement.
+        Gets the rendered surface of a message, re-using the least recently used cache of surfaces.
+        The returned surface is shared, so it must not be drawn on.
+        :param pygame.Surface target: The surface the text will be blitted onto
+        :param str font_dir: The path to the font file
+        :param str message: The text to render
+        :param int size: The size of the font
+        :param Tuple[int, ...] color: The colour of the text
+        :return: pygame.Surface
+        """
+        key = (font_dir, message, size, tuple(color))
+        if key in self.__surfaces:
+            self.__surfaces.move_to_end(key)
+            return self.__surfaces[key]
+
+        font_surf = self.font(font_dir, size).render(message, False, color).convert_alpha(target)
+        self.__surfaces[key] = font_surf
+        if len(self.__surfaces) > self.__max_surfaces:
+            self.__surfaces.popitem(last=False)
+
+        return font_surf
+
+
+class Scheduler(metaclass=Singleton):
+    """
+    A central timer heap. Components register callbacks to fire after a delay, instead of checking the time themselves
+    every frame, so each frame only costs as much as the timers that are due. Time either follows a monotonic clock, or
+    advances by a fixed amount every frame so that runs can be driven deterministically.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, frame_ms: Optional[float] = None) -> None:
+        """
+        Cancels every timer and restarts the clock.
+        :param float frame_ms: If given, time advances by this many milliseconds per frame, rather than following the
+        monotonic clock.
         :return: None
         """
-        # remove the previous positioned object from the screen
-        self._surface.blit(self._filler_surf, self._rect)
+        self.__timers: List[List[Any]] = []
+        self.__sequence = itertools.count()  # breaks ties, so timers due at the same time fire in the order they were made
+        self.__frame_ms = frame_ms
+        self.__start = time.monotonic()
+        self.__now = 0.0
+
+    def schedule(self, delay_ms: float, callback: Callable[..., None], *args) -> List[Any]:
+        """
+        Fires a callback once a delay has passed.
+        :param float delay_ms: How long to wait, in milliseconds
+        :param Callable[..., None] callback: The function to call
+        :param args: Arguments to pass to the callback
+        :return: List[Any], a handle that can be given to cancel
+        """
+        timer = [self.__now + delay_ms, next(self.__sequence), callback, args]
+        heapq.heappush(self.__timers, timer)
+        return timer
+
+    @staticmethod
+    def cancel(timer: Optional[List[Any]]) -> None:
+        """
+        Stops a timer from firing, if it hasn't already.
+        :param List[Any] timer: The handle returned by schedule
+        :return: None
+        """
+        if timer is not None:
+            timer[2] = None  # cancelled timers stay in the heap, and are skipped when they become due
+
+    def tick(self) -> None:
+        """
+        Advances the clock, then fires every timer that has become due.
+        :return: None
+        """
+        if self.__frame_ms is None:
+            self.__now = (time.monotonic() - self.__start) * 1000
+
+        else:
+            self.__now += self.__frame_ms
+
+        while self.__timers and self.__timers[0][0] <= self.__now:
+            _, _, callback, args = heapq.heappop(self.__timers)
+            if callback is not None:
+                callback(*args)
+
+    @property
+    def now(self) -> float:
+        """
+        The time at the last tick, in milliseconds.
+        """
+        return self.__now
+
+
+class Profiler(metaclass=Singleton):
+    """
+    Times each phase of a frame, keeping a rolling history of them to show in an overlay, and optionally a trace of
+    every phase that can be exported for offline analysis. When it's disabled, timing a phase is just a method call
+    that returns straight away. Phases can be timed from the simulation thread too, and the trace records which thread
+    each one ran on.
+    """
+    OVERLAY_FONT = "Fonts/Arcadepix.TTF"
+    OVERLAY_REFRESH = 15  # frames between redraws of the overlay, so the numbers stay readable
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, enabled: bool = False, history: int = 120, trace: bool = False, max_events: int = 1_000_000) -> None:
+        """
+        Throws away every timing, and sets how the profiler records.
+        :param bool enabled: Whether to time phases at all
+        :param int history: How many frames the rolling averages cover
+        :param bool trace: Whether to keep every timed phase, so that it can be exported
+        :param int max_events: The most phases to keep in the trace, after which the oldest are dropped
+        :return: None
+        """
+        self.__enabled = enabled
+        self.__history = history
+        self.__trace: Optional[Deque[Tuple[str, int, int, int, int]]] = deque(maxlen=max_events) if trace else None
+        self.__starts: Dict[str, int] = {}
+        self.__current: Dict[str, int] = {}  # total nanoseconds of each phase this frame
+        self.__frames: Dict[str, Deque[int]] = {}  # phase: its totals over the last history frames
+        self.__frame = 0
+        self.__origin = time.perf_counter_ns()
+        self.__overlay = False
+        self.__overlay_surf: Optional[pygame.Surface] = None
+        self.__overlay_rect: Optional[Rect] = None
+
+    def begin(self, phase: str) -> None:
+        """
+        Starts timing a phase. Phases can be nested inside each other, as long as their names differ.
+        :param str phase: The name of the phase
+        :return: None
+        """
+        if self.__enabled:
+            if phase not in self.__frames:  # keeps the phases in the order they start, for the overlay
+                self.__frames[phase] = deque(maxlen=self.__history)
+
+            self.__starts[phase] = time.perf_counter_ns()
+
+    def end(self, phase: str) -> None:
+        """
+        Stops timing a phase, adding its time to the frame's total for that phase.
+        :param str phase: The name of the phase, as given to begin
+        :return: None
+        """
+        if not self.__enabled:
+            return
+
+        # the profiler may have been turned on partway through the phase, in which case it never began timing it
+        start = self.__starts.pop(phase, None)
+        if start is None:
+            return
+
+        duration = time.perf_counter_ns() - start
+        self.__current[phase] = self.__current.get(phase, 0) + duration
+        if self.__trace is not None:
+            self.__trace.append((phase, start - self.__origin, duration, self.__frame, threading.get_ident()))
+
+    def end_frame(self) -> None:
+        """
+        Adds this frame's phase totals to the rolling history, ready for the next frame.
+        :return: None
+        """
+        if not self.__enabled:
+            return
+
+        for phase, totals in self.__frames.items():
+            totals.append(self.__current.get(phase, 0))  # phases that didn't run this frame took no time
+
+        self.__current = {}
+        self.__frame += 1
+
+    def averages(self) -> Dict[str, float]:
+        """
+        Gets the mean time each phase has taken per frame, over the rolling history.
+        :return: Dict[str, float], phase: milliseconds, in the order the phases first ran
+        """
+        return {phase: sum(totals) / len(totals) / 1e6 for phase, totals in self.__frames.items() if totals}
+
+    def draw_overlay(self, surface: pygame.Surface) -> None:
+        """
+        Draws the rolling phase times in the top right corner of the screen, if the overlay is being shown.
+        :param pygame.Surface surface: The screen
+        :return: None
+        """
+        if not self.__overlay:
+            return
+
+        # the overlay is redrawn every so often, and whenever it's shown again after being erased
+        if self.__overlay_rect is None or self.__frame % Profiler.OVERLAY_REFRESH == 0:
+            font = TextCache().font(Profiler.OVERLAY_FONT, 16)
+            lines = [font.render(f"{phase} {ms:6.3f} ms", False, (0, 0, 0)) for phase, ms in self.averages().items()]
+            self.__overlay_surf = pygame.Surface((max([line.get_width() for line in lines], default=1),
+                                                  max(1, len(lines) * font.get_linesize())))
+            self.__overlay_surf.fill(WHITE)
+            self.__overlay_surf.blits([(line, (0, i * font.get_linesize())) for i, line in enumerate(lines)], False)
+            self.erase_overlay(surface)
+
+        elif not RenderQueue().was_damaged(self.__overlay_rect):
+            return  # nothing has been drawn over it since last frame
+
+        self.__overlay_rect = self.__overlay_surf.get_rect(topright=(surface.get_width() - 5, 30))
+        RenderQueue().draw(RenderQueue.OVERLAY, self.__overlay_surf, self.__overlay_rect)
+
+    def erase_overlay(self, surface: pygame.Surface) -> None:
+        """
+        Clears the overlay off the screen.
+        :param pygame.Surface surface: The screen
+        :return: None
+        """
+        if self.__overlay_rect is not None:
+            RenderQueue().erase(self.__overlay_rect)
+            self.__overlay_rect = None
+
+    def export(self, path: str) -> None:
+        """
+        Writes the trace to a file, as Chrome trace events if it ends in .json (which chrome://tracing and Perfetto can
+        open), or otherwise as CSV.
+        :param str path: The file to write to
+        :return: None
+        """
+        events = self.__trace or []
+        with open(path, "w", newline="") as file:
+            if path.endswith(".json"):
+                json.dump({"displayTimeUnit": "ms", "traceEvents": [
+                    {"name": phase, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": 0, "tid": thread,
+                     "args": {"frame": frame}} for phase, start, duration, frame, thread in events]}, file)
+
+            else:
+                writer = csv.writer(file)
+                writer.writerow(["frame", "phase", "start_ms", "duration_ms", "thread"])
+                writer.writerows([(frame, phase, start / 1e6, duration / 1e6, thread)
+                                  for phase, start, duration, frame, thread in events])
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def overlay(self) -> bool:
+        return self.__overlay
+
+    @overlay.setter
+    def overlay(self, show: bool):
+        # the overlay needs timings to show, so showing it turns the profiler on
+        self.__overlay = show
+        self.__enabled = self.__enabled or show
+
+
+class Text:
+    __slots__ = ("_surface", "_message", "_font_dir", "_size", "_pos", "_color", "_font_surf", "_rendered_color",
+                 "_centralised")
+
+    def __init__(self, *args):
+        self._surface: pygame.Surface = args[0]
+        self._message: str = args[1]
+        self._font_dir: str = args[2]
+        self._size: int = args[3]
+        self._pos: Tuple[int, int] = args[4]
+        self._color: Tuple[int, int, int] = args[5]
+        self._font_surf: pygame.Surface = TextCache().render(args[0], args[2], args[1], args[3], args[5])
+        self._rendered_color = self._color
+        self._centralised = False
+
+    def update_text(self, new_message: str, centralise: bool = False) -> None:
+        """
+        Updates the text in the currently displayed text surface
+        :param str new_message: The new message
+        :param bool centralise: Whether we need to centralise the text around the given position
+        :return: None
+        """
+        if new_message == self._message and self._color == self._rendered_color and centralise == self._centralised:
+            # nothing to re-render, but the text needs drawing again if sprites were drawn over it last frame.
+            if RenderQueue().was_damaged(self.__screen_rect(-self._font_surf.get_rect().centerx if centralise else 0)):
+                self.draw(mod_x=(-self._font_surf.get_rect().centerx if centralise else 0))
+
+            return
+
+        # if it was centralised before, good chance it will be again.
+        RenderQueue().erase(self.__screen_rect(-self._font_surf.get_rect().centerx if centralise else 0))
+
+        self._font_surf = TextCache().render(self._surface, self._font_dir, new_message, self._size, self._color)
+        self._message = new_message
+        self._rendered_color = self._color
+        self._centralised = centralise
+        self.draw(mod_x=(-self._font_surf.get_rect().centerx if centralise else 0))
+
+    def __screen_rect(self, mod_x: int = 0, mod_y: int = 0) -> Rect:
+        """
+        Gets the area of the screen the text surface covers.
+        :return: Rect
+        """
+        return Rect(
+            mod_x + (self._surface.get_width() + self._pos[0] - self._font_surf.get_width() if self._pos[0] < 0 else self._pos[0]),
+            mod_y + (self._surface.get_height() + self._pos[1] - self._font_surf.get_height() if self._pos[1] < 0 else self._pos[1]),
+            self._font_surf.get_width(),
+            self._font_surf.get_height()
+        )
+
+    def draw(self, mod_x: int = 0, mod_y: int = 0) -> None:
+        """
+        Blits the text onto the screen
+        :return: None
+        """
+        RenderQueue().draw(RenderQueue.TEXT, self._font_surf, self.__screen_rect(mod_x, mod_y))
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, new_pos):
+        self._pos = new_pos
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, new_color: Union[Tuple[int, int, int], Tuple[int, int, int, int]]):
+        self._color = new_color
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, new_size: int):
+        self._size = new_size
+        self._font_surf = TextCache().render(self._surface, self._font_dir, self._message, new_size, self._color)
+        self._rendered_color = self._color
+
+    @property
+    def surface(self) -> pygame.Surface:
+        return self._font_surf
+
+    @property
+    def message(self):
+        return self._message
+
+
+class AssetManager(metaclass=Singleton):
+    """
+    Loads each image once and shares it between every sprite that uses it, along with any transform applied to it, e.g.
+    the bats' rotation. Images can also be packed into a single atlas file, which is read in one go at startup rather
+    than decoding every PNG, and whose images all share the same pixel data.
+    """
+    MAGIC = b"NUGA"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBHHH")  # magic, version, width, height, number of images
+    ENTRY = struct.Struct("<HHHH")  # x, y, width and height of an image, after its length-prefixed path
+    PADDING = 1  # pixels between packed images, so that scaling never samples a neighbour
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, target: Optional[pygame.Surface], atlas_path: Optional[str] = ATLAS_PATH) -> None:
+        """
+        Forgets every loaded image, and loads the atlas if there is an up-to-date one.
+        :param pygame.Surface target: The surface the images will be blitted onto, which they're converted to match
+        :param str atlas_path: The atlas to load images from, if it exists and none of its images have changed since
+        it was built
+        :return: None
+        """
+        self.__target = target
+        self.__images: Dict[Tuple[str, int], pygame.Surface] = {}
+        self.__atlas: Optional[pygame.Surface] = None
+        self.loads = 0  # the number of image files decoded, which an atlas brings down to 1
+        if target is not None and atlas_path and os.path.exists(atlas_path):
+            self.__load_atlas(atlas_path)
+
+    def __load_atlas(self, atlas_path: str) -> None:
+        """
+        Reads an atlas, sharing its pixels between subsurfaces for each of its images.
+        :param str atlas_path: The path to the atlas
+        :return: None
+        """
+        with open(atlas_path, "rb") as file:
+            data = file.read()
+
+        magic, version, width, height, count = AssetManager.HEADER.unpack_from(data)
+        if magic != AssetManager.MAGIC or version != AssetManager.VERSION:
+            return
+
+        offset = AssetManager.HEADER.size
+        entries = {}
+        for _ in range(count):
+            length = struct.unpack_from("<H", data, offset)[0]
+            path = data[offset + 2: offset + 2 + length].decode()
+            offset += 2 + length
+            entries[path] = Rect(AssetManager.ENTRY.unpack_from(data, offset))
+            offset += AssetManager.ENTRY.size
+
+        built = os.path.getmtime(atlas_path)
+        if any(os.path.exists(path) and os.path.getmtime(path) > built for path in entries):
+            return  # an image has been edited since, so the atlas is out of date
+
+        self.__atlas = pygame.image.frombuffer(data[offset:], (width, height), "RGBA").convert_alpha(self.__target)
+        self.loads += 1
+        for path, area in entries.items():
+            self.__images[(path, 0)] = self.__atlas.subsurface(area)
+
+    def image(self, path: str, rotation: int = 0) -> pygame.Surface:
+        """
+        Gets an image, loading it the first time it's asked for.
+        :param str path: The path to the image
+        :param int rotation: Degrees to rotate the image anticlockwise by
+        :return: pygame.Surface, which is shared and so must not be drawn on
+        """
+        key = (path, rotation % 360)
+        if key not in self.__images:
+            if key[1]:
+                self.__images[key] = pygame.transform.rotate(self.image(path), key[1])
+
+            else:
+                self.__images[key] = pygame.image.load(path).convert_alpha(self.__target)
+                self.loads += 1
+
+        return self.__images[key]
+
+    @staticmethod
+    def build_atlas(paths: List[str], atlas_path: str = ATLAS_PATH) -> None:
+        """
+        Packs images into rows of an atlas file, tallest first.
+        :param List[str] paths: The images to pack
+        :param str atlas_path: The file to write the atlas to
+        :return: None
+        """
+        images = {path: pygame.image.load(path) for path in paths}
+        order = sorted(paths, key=lambda path: (-images[path].get_height(), path))
+        row_width = max(max([image.get_width() for image in images.values()]),
+                        int(sum([image.get_width() * image.get_height() for image in images.values()]) ** 0.5))
+
+        areas: Dict[str, Rect] = {}
+        x = y = shelf_height = 0
+        for path in order:
+            width, height = images[path].get_size()
+            if x + width > row_width:  # start a new row
+                x, y, shelf_height = 0, y + shelf_height + AssetManager.PADDING, 0
+
+            areas[path] = Rect(x, y, width, height)
+            x += width + AssetManager.PADDING
+            shelf_height = max(shelf_height, height)
+
+        pixels = np.zeros((y + shelf_height, row_width, 4), np.uint8)
+        for path, area in areas.items():
+            pixels[area.top:area.bottom, area.left:area.right] = np.frombuffer(
+                pygame.image.tobytes(images[path], "RGBA"), np.uint8).reshape(area.height, area.width, 4)
+
+        with open(atlas_path, "wb") as file:
+            file.write(AssetManager.HEADER.pack(AssetManager.MAGIC, AssetManager.VERSION, row_width, pixels.shape[0],
+                                                len(areas)))
+            for path, area in areas.items():
+                encoded = path.encode()
+                file.write(struct.pack("<H", len(encoded)) + encoded + AssetManager.ENTRY.pack(*area))
+
+            file.write(pixels.tobytes())
+
+    @property
+    def used(self) -> int:
+        """
+        The number of bytes of pixel data held by the loaded images, counting the atlas once for all of its images.
+        """
+        surfaces = {image.get_parent() or image for image in self.__images.values()}
+        return sum([surface.get_width() * surface.get_height() * surface.get_bytesize() for surface in surfaces])
+
+
+class Sprite:
+    # sprites are made in large pools, so they keep their attributes in slots rather than a dict each
+    __slots__ = ("uid", "grid_group", "_surface", "_image", "_filler_surf", "_image_outline", "_rect", "_prev_rect",
+                 "_direction", "_base_speed", "_speed", "_velocity")
+    __uids = itertools.count()
+    ROTATION = 0  # degrees the sprite's images are rotated by, when they're loaded
+    LAYER = RenderQueue.CATS  # the layer of the render queue the sprite is drawn on
+
+    def __init__(self, *args):
+        self.uid = next(Sprite.__uids)  # the order sprites were made in, which is the order they sit in their pools
+        self.grid_group: Optional[str] = None
+        self._surface: pygame.Surface = args[0]
+        # images and fillers are shared between every sprite that uses them, so they must never be drawn on
+        self._image: pygame.Surface = AssetManager().image(args[1][0], self.ROTATION)
+        self._filler_surf = AnimationCache().filler(self._image.get_size())
+
+        self._image_outline = args[1][1]
+        if args[1][1]:
+            self._image_outline = AssetManager().image(args[1][1], self.ROTATION)
+
+        # both rects are updated in place from here on, so they mustn't be the same object
+        self._rect = Rect(args[2][0], args[2][1], self._image.get_width(), self._image.get_height())
+        self._prev_rect = Rect(self._rect)
+        self._direction = (0, 0)
+        self._base_speed = 0
+        self._speed = 0
+        self._velocity = (0, 0)
+
+    def move_pos(self, x: int, y: int, update_prev_rect: bool = True) -> None:
+        """
+        Moves the position of where the object is drawn on the screen
+        :param int x: x modifier
+        :param int y: y modifier
+        :param bool update_prev_rect: Whether we change the previous rect during a movement.
+        :return: None
+        """
+        # remove the previous positioned object from the screen
+        RenderQueue().erase(self._rect, self._filler_surf)
+
+        if update_prev_rect:
+            self._prev_rect.update(self._rect)
+
+        self._rect.update(  # changes the rect of the object, whilst ensuring it's in the screen
+            max(0, min(self._rect[0] + x, self._surface.get_width() - self._rect.width)),
+            max(0, min(self._rect[1] + y, self._surface.get_height() - self._rect.height)),
+            self._image.get_width(),
+            self._image.get_height()
+        )
+        if self.grid_group is not None:
+            SpatialHash().move(self)
+
+    def draw(self, outline: bool = False) -> None:
+        """
+        Draws the sprite onto the main surface.
+        :param bool outline: Whether we are drawing the sprites outline or not.
+        :return: None
+        """
+        if outline and self._image_outline:
+            RenderQueue().erase(self._rect, self._filler_surf)
+            RenderQueue().draw(self.LAYER, self._image_outline, self._rect)
+
+        else:
+            RenderQueue().draw(self.LAYER, self._image, self._rect)
+
+    @property
+    def surface(self):
+        """
+        Returns the sprite's surface
+        """
+        return self._image
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @direction.setter
+    def direction(self, new_direction: Tuple[int, int]):
+        self._direction = new_direction
+        self._velocity = (new_direction[0] * self._speed, new_direction[1] * self._speed)
+
+    @property
+    def base_speed(self):
+        return self._base_speed
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, new_speed):
+        self._speed = new_speed
+        self._velocity = (self._direction[0] * new_speed, self._direction[1] * new_speed)
+
+    @property
+    def rect(self):
+        return self._rect
+
+    @property
+    def prev_rect(self):
+        return self._prev_rect
+
+    @property
+    def frame(self) -> pygame.Surface:
+        """
+        The image the sprite is currently drawn with, at the top left of its rect.
+        """
+        return self._image
+
+    @property
+    def mask(self) -> pygame.mask.Mask:
+        """
+        The collision mask of the sprite's current frame.
+        """
+        return AnimationCache().mask(self.frame)
+
+    @property
+    def velocity(self):
+        return self._velocity  # kept up to date by the direction and speed setters, rather than made on every read
+
+
+class AnimationCache(metaclass=Singleton):
+    """
+    Memoises the rotated and scaled frames of sprite images, so that every sprite sharing an image shares its animation
+    frames too. Frames are evicted least recently used first once they take up more than the memory budget. The
+    collision mask of each frame is made the first time it's needed, and kept for as long as the frame is.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, budget: int = 16 * 1024 * 1024) -> None:
+        """
+        Empties the cache.
+        :param int budget: The most bytes of pixel data to keep cached
+        :return: None
+        """
+        self.__frames: OrderedDict[Tuple[Any, ...], pygame.Surface] = OrderedDict()
+        self.__masks: weakref.WeakKeyDictionary[pygame.Surface, pygame.mask.Mask] = weakref.WeakKeyDictionary()
+        self.__budget = budget
+        self.__used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __get(self, key: Tuple[Any, ...], make_frame: Callable[[], pygame.Surface]) -> pygame.Surface:
+        """
+        Gets a frame from the cache, making and storing it if it isn't there.
+        :param Tuple[Any, ...] key: What identifies the frame
+        :param Callable[[], pygame.Surface] make_frame: Renders the frame
+        :return: pygame.Surface
+        """
+        frame = self.__frames.get(key)
+        if frame is not None:
+            self.__frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = make_frame()
+        self.__frames[key] = frame
+        self.__used += frame.get_width() * frame.get_height() * frame.get_bytesize()
+        while self.__used > self.__budget and len(self.__frames) > 1:
+            _, evicted = self.__frames.popitem(last=False)
+            self.__used -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+
+        return frame
+
+    def rotated(self, image_key: str, image: pygame.Surface, angle: int) -> pygame.Surface:
+        """
+        Gets an image rotated anticlockwise by a whole number of degrees.
+        :param str image_key: Identifies the image, e.g. the cat type
+        :param pygame.Surface image: The image to rotate
+        :param int angle: The angle to rotate by, in degrees
+        :return: pygame.Surface, which is shared and so must not be drawn on
+        """
+        angle %= 360
+        return self.__get((image_key, "rotated", angle), lambda: pygame.transform.rotate(image, angle))
+
+    def scaled(self, image_key: str, image: pygame.Surface, size: Tuple[int, int]) -> pygame.Surface:
+        """
+        Gets an image scaled to a size.
+        :param str image_key: Identifies the image, e.g. the cat type
+        :param pygame.Surface image: The image to scale
+        :param Tuple[int, int] size: The size to scale to
+        :return: pygame.Surface, which is shared and so must not be drawn on
+        """
+        return self.__get((image_key, "scaled", size), lambda: pygame.transform.scale(image, size))
+
+    def filler(self, size: Tuple[int, int]) -> pygame.Surface:
+        """
+        Gets a white surface, used to erase a sprite of the given size.
+        :param Tuple[int, int] size: The size of the surface
+        :return: pygame.Surface, which is shared and so must not be drawn on
+        """
+        def make_filler() -> pygame.Surface:
+            filler_surf = pygame.Surface(size, SRCALPHA)
+            filler_surf.fill(WHITE)
+            return filler_surf
+
+        return self.__get(("filler", size), make_filler)
+
+    def mask(self, frame: pygame.Surface) -> pygame.mask.Mask:
+        """
+        Gets the collision mask of an image, or of one of the frames made from it, of the pixels that aren't transparent.
+        :param pygame.Surface frame: A shared image or frame, e.g. from rotated or scaled
+        :return: pygame.mask.Mask, which is shared and so must not be changed
+        """
+        mask = self.__masks.get(frame)
+        if mask is None:
+            mask = self.__masks[frame] = pygame.mask.from_surface(frame)
+
+        return mask
+
+    @property
+    def used(self) -> int:
+        """
+        The number of bytes of pixel data currently cached.
+        """
+        return self.__used
+
+
+class Cat(Sprite):
+    __slots__ = ("__state", "__scale_size", "__step_timer", "__rotation", "__cat_type")
+    # --- lifecycle states, and the events that move a cat between them --- #
+    HIDDEN, GROWING, SPINNING, UNWINDING, SHRINKING = range(5)
+    ACTIVATE, GROWN, ALIGNED, SHRUNK, RESET = range(5)
+    TRANSITIONS = {
+        (HIDDEN, ACTIVATE): GROWING,
+        (GROWING, GROWN): SPINNING,
+        (SPINNING, ACTIVATE): UNWINDING,  # finish the current turn before shrinking away
+        (UNWINDING, ALIGNED): SHRINKING,
+        (SHRINKING, SHRUNK): GROWING,  # once shrunk, the cat reappears somewhere else
+        (GROWING, RESET): HIDDEN,
+        (SPINNING, RESET): HIDDEN,
+        (UNWINDING, RESET): HIDDEN,
+        (SHRINKING, RESET): HIDDEN,
+    }
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.__state = Cat.HIDDEN
+        self.__scale_size = (self._image.get_width() - 13, self._image.get_height() - 13)
+        self._rect.topleft = (RNG.randrange(100, self._surface.get_width() - 100),
+                              RNG.randrange(0, self._surface.get_height() - self._image.get_height()))
+        self.__step_timer = None
+        self.__rotation = 0
+        self.__cat_type = args[1][0][args[1][0].rindex("/") + 1: args[1][0].rindex(".")]
+
+    def __transition(self, event: int) -> None:
+        """
+        Moves the cat to the next state of its lifecycle, if the event applies to the state it's in.
+        :param int event: The event that has happened
+        :return: None
+        """
+        self.__state = Cat.TRANSITIONS.get((self.__state, event), self.__state)
+
+    def update(self) -> None:
+        """
+        Performs this frame's animation for whichever state the cat is in.
+        :return: None
+        """
+        Cat.__UPDATES[self.__state](self)
+
+    def __grow(self) -> None:
+        self.enlarge(1, 1, self._image.get_size())
+
+    def __spin(self) -> None:
+        self.rotate()
+
+    def __unwind(self) -> None:
+        if self.__rotation % 360 == 0:
+            self.__transition(Cat.ALIGNED)
+
+        else:
+            self.rotate()
+
+    def __shrink(self) -> None:
+        self.enlarge(-1, -1, (self._image.get_width() - 13, self._image.get_height() - 13))
+
+    __UPDATES = {HIDDEN: lambda self: None, GROWING: __grow, SPINNING: __spin, UNWINDING: __unwind, SHRINKING: __shrink}
+
+    def enlarge(self, mod_scale_x: int, mod_scale_y: int, scale_limit: Tuple[int, int]) -> None:
+        """
+        Slowly enlarges or shrinks the image, by a step every 50ms.
+        :param int mod_scale_x: How much to change the scale size, in the x-direction, by.
+        :param int mod_scale_y: How much to change the scale size, in the y-direction, by.
+        :param Tuple[int, int] scale_limit: The point at which the sprite cannot enlarge or shrink any further.
+        :return: None
+        """
+        if self.__step_timer is None:  # take the next step in 50ms, unless one's already on its way
+            self.__step_timer = Scheduler().schedule(50, self.__enlarge_step, mod_scale_x, mod_scale_y, scale_limit)
+
+    def __enlarge_step(self, mod_scale_x: int, mod_scale_y: int, scale_limit: Tuple[int, int]) -> None:
+        """
+        Enlarges or shrinks the image by a single step.
+        :param int mod_scale_x: How much to change the scale size, in the x-direction, by.
+        :param int mod_scale_y: How much to change the scale size, in the y-direction, by.
+        :param Tuple[int, int] scale_limit: The point at which the sprite cannot enlarge or shrink any further.
+        :return: None
+        """
+        self.__step_timer = None
+        self.__scale_size = (max(self.__scale_size[0] + mod_scale_x, self._image.get_width() - 13), max(self.__scale_size[1] + mod_scale_y, self._image.get_height() - 13))
+        self.move_pos(-mod_scale_x, -mod_scale_y, False)
+        RenderQueue().draw(Cat.LAYER, AnimationCache().scaled(self.__cat_type, self._image, self.__scale_size), self._rect)
+
+        if self.__scale_size == scale_limit:
+            self.__transition(Cat.GROWN if mod_scale_x > 0 else Cat.SHRUNK)
+
+            if mod_scale_x < 0:  # if the sprite was shrinking, then reposition the sprite once disappeared
+                self.move_pos(RNG.randrange(100, self._surface.get_width() - 100) - self._rect[0],
+                              RNG.randrange(0, self._surface.get_height() - self._image.get_height()) - self._rect[1])
+
+    def rotate(self, degrees: int = 1) -> None:
+        """
+        Rotate a cat by a certain amount of degrees.
+        :param int degrees: The amount of degrees to rotate object.
+        :return: None
+        """
+        self.__rotation += degrees
+
+        rotated_image = AnimationCache().rotated(self.__cat_type, self._image, self.__rotation)
+        self._filler_surf = AnimationCache().filler(rotated_image.get_size())
+        self._rect.size = rotated_image.get_size()
+        if self.grid_group is not None:
+            SpatialHash().move(self)
+
+        RenderQueue().erase(self._rect, self._filler_surf)
+        RenderQueue().draw(Cat.LAYER, rotated_image, self._rect)
+
+    def activate(self):
+        """
+        Makes the cat power-up active, which means that it will begin to appear on the screen. However, if it's already
+        active/on the screen, then it will need to disappear.
+        """
+        self.__transition(Cat.ACTIVATE)
+
+    def reset(self) -> None:
+        """
+        Resets relevant cat attributes in order for re-use.
+        :return: None
+        """
+        self.__transition(Cat.RESET)
+        self.__scale_size = (self._image.get_width() - 13, self._image.get_height() - 13)
+        self.__rotation = 0
+        Scheduler.cancel(self.__step_timer)
+        self.__step_timer = None
+        RenderQueue().erase(self._rect, self._filler_surf)
+
+    @property
+    def state(self) -> int:
+        return self.__state
+
+    @property
+    def cat_type(self) -> str:
+        return self.__cat_type
+
+    @property
+    def rotation(self):
+        return self.__rotation
+
+    @rotation.setter
+    def rotation(self, new_rotation):
+        self.__rotation = new_rotation
+
+    @property
+    def scale_size(self):
+        return self.__scale_size
+
+    @scale_size.setter
+    def scale_size(self, new_scale):
+        self.__scale_size = new_scale
+
+    @property
+    def frame(self) -> pygame.Surface:
+        # the same frame that rotate or __enlarge_step last drew
+        if self.__rotation % 360:
+            return AnimationCache().rotated(self.__cat_type, self._image, self.__rotation)
+
+        return AnimationCache().scaled(self.__cat_type, self._image, self.__scale_size)
+
+
+class Controller:
+    """
+    Decides which way a bat moves each frame. Every bat has one, and subclasses decide in their own way, e.g. from the
+    keyboard or as a bot.
+    """
+    def move(self, game: "Game", bat: "Player") -> int:
+        """
+        Decides which way the bat moves this frame.
+        :param Game game: The game being played
+        :param Player bat: The bat being controlled
+        :return: int, -1 to move the bat up, 1 to move it down, or 0 to keep it still
+        """
+        return 0
+
+
+class KeyboardController(Controller):
+    """
+    Moves a bat while its keys are held down.
+    """
+    def __init__(self, up_key: int, down_key: int):
+        """
+        :param int up_key: The key that moves the bat up
+        :param int down_key: The key that moves the bat down
+        """
+        self.__up_key = up_key
+        self.__down_key = down_key
+
+    def move(self, game: "Game", bat: "Player") -> int:
+        keys = pygame.key.get_pressed()
+        return keys[self.__down_key] - keys[self.__up_key]
+
+
+class InterceptBot(Controller):
+    """
+    Moves a bat to where the ball that'll reach it soonest is predicted to cross its face, or back to the middle if no
+    ball is coming. Every ball in play is predicted at once by BallEngine.intercepts, so a bot costs about the same
+    however many balls there are.
+    """
+    def __init__(self, reaction_ms: float = 100, error: float = 12, seed: int = None):
+        """
+        :param float reaction_ms: How long, in game time, the bot takes to act on what it sees. It predicts where the
+        balls are going every frame, but moves on the prediction it made this long ago
+        :param float error: The standard deviation of how far, in pixels, the bot misjudges where each ball will be
+        :param int seed: The seed of the bot's misjudgements, random by default
+        """
+        self.__reaction_ms = reaction_ms
+        self.__error = error
+        self.__rng = Random(seed)
+        self.__predictions: Deque[Tuple[float, float]] = deque()  # when each prediction was made, and where it aimed
+        self.__steps: Optional[int] = None  # how far off the ball being aimed at was, at the last prediction
+        self.__misjudged = 0.0
+
+    def move(self, game: "Game", bat: "Player") -> int:
+        now = Scheduler().now
+        if self.__predictions and now < self.__predictions[-1][0]:  # the game's clock has started over
+            self.__predictions.clear()
+
+        self.__predictions.append((now, self.__aim(game, bat)))
+        # act on the newest prediction that's at least reaction_ms old, or the oldest until there is one
+        while len(self.__predictions) > 1 and now - self.__predictions[1][0] >= self.__reaction_ms:
+            self.__predictions.popleft()
+
+        target = self.__predictions[0][1]
+        # within a step of the target is close enough, otherwise the bat would jitter around it
+        if target < bat.rect.centery - bat.speed:
+            return -1
+
+        return 1 if target > bat.rect.centery + bat.speed else 0
+
+    def __aim(self, game: "Game", bat: "Player") -> float:
+        """
+        Works out where the bat should go.
+        :param Game game: The game being played
+        :param Player bat: The bat being controlled
+        :return: float, the y the bat's centre should move to
+        """
+        on_left = bat.rect.centerx < game.surface.get_width() // 2
+        steps, centres = BallEngine().intercepts(bat.rect.right if on_left else bat.rect.left, -1 if on_left else 1)
+        if not len(steps):
+            self.__steps = None
+            return game.surface.get_height() / 2
+
+        # a ball only gets closer as it comes in, so the soonest one being further off means it's a new one to misjudge
+        soonest = int(np.argmin(steps))
+        if self.__steps is None or steps[soonest] > self.__steps:
+            self.__misjudged = self.__rng.gauss(0, self.__error)
+
+        self.__steps = int(steps[soonest])
+        return float(centres[soonest]) + self.__misjudged
+
+    @property
+    def reaction_ms(self) -> float:
+        return self.__reaction_ms
+
+    @property
+    def error(self) -> float:
+        return self.__error
+
+
+class Player(Sprite):
+    __slots__ = ("__score", "__controller")
+    ROTATION = 90  # the paddle images are drawn lying down
+    LAYER = RenderQueue.BATS
+    MOVE_SPEED = 7
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._base_speed = Player.MOVE_SPEED
+        self.speed = Player.MOVE_SPEED
+        self.direction = (0, 1)
+        self.__score = 0
+        self.__controller = Controller()
+
+    @property
+    def score(self) -> int:
+        return self.__score
+
+    @score.setter
+    def score(self, new_score):
+        self.__score = new_score
+
+    @property
+    def controller(self) -> Controller:
+        """
+        What decides which way the bat moves, when the game isn't being given its controls some other way.
+        """
+        return self.__controller
+
+    @controller.setter
+    def controller(self, new_controller: Controller):
+        self.__controller = new_controller
+
+
+class BallEngine(metaclass=Singleton):
+    """
+    Holds the state of every ball in flat arrays, so that all the balls in play can be moved, bounced off the walls,
+    checked for scoring and drawn in a handful of array operations. Ball objects are thin views over a slot in these
+    arrays.
+    """
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, surface: Optional[pygame.Surface], capacity: int = 16) -> None:
+        """
+        Forgets every ball, ready for a new game.
+        :param pygame.Surface surface: The screen the balls move around
+        :param int capacity: How many balls to make room for, before the arrays need to grow
+        :return: None
+        """
+        self.__surface = surface
+        self.__balls: List[Any] = []
+        self.__images: List[pygame.Surface] = []
+        self.__fillers: List[pygame.Surface] = []
+        self.__count = 0
+        # one row per field in Ball.FIELDS, one column per ball
+        self.__state = np.zeros((len(Ball.FIELDS), capacity), dtype=np.int64)
+
+    def register(self, ball) -> int:
+        """
+        Gives a ball a slot in the arrays, growing them if they're full.
+        :param ball: The ball to add
+        :return: int, the ball's slot
+        """
+        if self.__count == self.__state.shape[1]:
+            self.__state = np.concatenate((self.__state, np.zeros_like(self.__state)), axis=1)
+
+        self.__images.append(None)
+        self.__fillers.append(None)
+        self.__count += 1
+        return self.__count - 1
+
+    def set_surfaces(self, slot: int, image: pygame.Surface, filler_surf: pygame.Surface) -> None:
+        """
+        Stores the surfaces a ball is drawn and erased with, so they can be batched without touching the ball objects.
+        :param int slot: The ball's slot
+        :param pygame.Surface image: The ball's image
+        :param pygame.Surface filler_surf: The surface that erases the ball
+        :return: None
+        """
+        self.__images[slot] = image
+        self.__fillers[slot] = filler_surf
+
+    def adopt(self, ball_pool: List[Any]) -> None:
+        """
+        Uses a pool of registered balls as the engine's own list, so that collision checks can tell when they've been
+        given every ball. Balls made later must be appended to the same list, so that each ball's slot is its index.
+        :param List[Any] ball_pool: Every registered ball, in slot order
+        :return: None
+        """
+        self.__balls = ball_pool
+
+    def owns(self, ball_pool: List[Any]) -> bool:
+        """
+        :param List[Any] ball_pool: A list of balls
+        :return: bool, whether the list is every ball in the engine
+        """
+        return ball_pool is self.__balls
+
+    def get(self, field: int, slot: int) -> int:
+        return int(self.__state[field, slot])
 
-        if update_prev_rect:
-            self._prev_rect = self._rect
+    def set(self, field: int, slot: int, value: int) -> None:
+        self.__state[field, slot] = value
 
-        self._rect = Rect(  # changes the rect of the object, whilst ensuring it's in the screen
-            max(0, min(self._rect[0] + x, self._surface.get_width() - self._rect.width)),
-            max(0, min(self._rect[1] + y, self._surface.get_height() - self._rect.height)),
-            self._image.get_width(),
-            self._image.get_height()
-        )
+    def advance(self) -> int:
+        """
+        Moves every ball in play by its velocity, for one physics step. Balls may end up past the edges of the screen,
+        until resolve_walls is called.
+        :return: int, the number of balls that were in play
+        """
+        x, y, _, _, prev_x, prev_y, dir_x, dir_y, speed = self.__state[:9, :self.__count]
+        moving = np.flatnonzero((dir_x != 0) | (dir_y != 0))
+        prev_x[moving], prev_y[moving] = x[moving], y[moving]
+        x[moving] += dir_x[moving] * speed[moving]
+        y[moving] += dir_y[moving] * speed[moving]
+        return len(moving)
+
+    def centres(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the centres of the balls in play.
+        :return: Tuple[np.ndarray, np.ndarray], their x and y coordinates
+        """
+        x, y, width, height, _, _, dir_x, dir_y = self.__state[:8, :self.__count]
+        moving = (dir_x != 0) | (dir_y != 0)
+        return x[moving] + width[moving] // 2, y[moving] + height[moving] // 2
 
-    def draw(self, outline: bool = False) -> None:
+    def intercepts(self, line_x: int, direction: int) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Draws the sprite onto the main surface.
-        :param bool outline: Whether we are drawing the sprites outline or not.
+        Predicts when and where every ball heading towards a vertical line will reach it. The bounces off the top and
+        bottom are folded into the prediction in closed form, so it costs the same however fast or far away the balls
+        are.
+        :param int line_x: The x of the line, e.g. the face of a bat
+        :param int direction: The horizontal direction of the balls to predict, -1 for those heading left to a line on
+        their left, or 1 for those heading right
+        :return: Tuple[np.ndarray, np.ndarray], how many physics steps until each ball's leading edge reaches the line,
+        and the y of its centre when it does
+        """
+        x, y, width, height, _, _, dir_x, dir_y, speed = self.__state[:9, :self.__count]
+        coming = np.flatnonzero(dir_x == direction)
+        distance = x[coming] - line_x if direction < 0 else line_x - x[coming] - width[coming]
+        steps = np.maximum(distance, 0) / np.maximum(speed[coming], 1)
+        # unfolded, the ball carries on in a straight line through the walls, so it's folded back into the span of tops
+        # that resolve_walls keeps it in, which mirrors it at each wall it would have bounced off
+        span = np.maximum(self.__surface.get_height() - height[coming], 1)
+        unfolded = np.mod(y[coming] + dir_y[coming] * speed[coming] * steps, 2 * span)
+        return steps, span - np.abs(unfolded - span) + height[coming] / 2
+
+    def resolve_walls(self) -> Tuple[int, int, List[Any]]:
+        """
+        Keeps every ball in play on the screen, bouncing it off the top and bottom, or taking it out of play if it
+        reaches either side.
+        :return: Tuple[int, int, List[Any]], the points scored by player 1 and player 2, and the balls taken out of play
+        """
+        x, y, width, height, _, _, dir_x, dir_y, speed, base_speed = self.__state[:10, :self.__count]
+        moving = np.flatnonzero((dir_x != 0) | (dir_y != 0))
+        if not len(moving):
+            return 0, 0, []
+
+        max_x = self.__surface.get_width() - width[moving]
+        max_y = self.__surface.get_height() - height[moving]
+        new_x = np.clip(x[moving], 0, max_x)
+        new_y = np.clip(y[moving], 0, max_y)
+        x[moving], y[moving] = new_x, new_y
+
+        bounced = (new_y == 0) | (new_y == max_y)
+        dir_y[moving[bounced]] *= -1
+        scored_2 = ~bounced & (new_x == 0)
+        scored_1 = ~bounced & ~scored_2 & (new_x == max_x)
+        scored = moving[scored_1 | scored_2]
+        dir_x[scored], dir_y[scored] = 0, 0
+        speed[scored] = base_speed[scored]
+
+        if bounced.any():
+            SoundManager().play("wall")
+
+        return int(scored_1.sum()), int(scored_2.sum()), [self.__balls[slot] for slot in scored.tolist()]
+
+    def draw(self, alpha: float) -> None:
+        """
+        Erases every ball where it was last drawn, then draws the balls in play between where they were before the last
+        physics step and where they are now.
+        :param float alpha: How far through the next physics step the game is, from 0 to 1
         :return: None
         """
-        self._surface.blit(self._image, self._rect)
-        if outline and self._image_outline:
-            self._surface.blit(self._filler_surf, self._rect)
-            self._surface.blit(self._image_outline, self._rect)
+        x, y, _, _, prev_x, prev_y, dir_x, dir_y, _, _, drawn_x, drawn_y, drawn = self.__state[:, :self.__count]
+        drawing = np.flatnonzero((dir_x != 0) | (dir_y != 0))
+        draw_x = prev_x[drawing] + np.rint((x[drawing] - prev_x[drawing]) * alpha).astype(np.int64)
+        draw_y = prev_y[drawing] + np.rint((y[drawing] - prev_y[drawing]) * alpha).astype(np.int64)
+
+        # erase every drawn ball first, then draw the ones in play
+        self.erase()
+        images = self.__images
+        blits = [(images[slot], (left, top)) for slot, left, top in zip(drawing.tolist(), draw_x.tolist(), draw_y.tolist())]
+        RenderQueue().draw_many(RenderQueue.BALLS, blits, self.__areas(drawing, draw_x, draw_y))
+        drawn_x[drawing], drawn_y[drawing], drawn[drawing] = draw_x, draw_y, 1
+
+    def erase(self) -> None:
+        """
+        Erases every ball where it was last drawn.
+        :return: None
+        """
+        drawn_x, drawn_y, drawn = self.__state[Ball.DRAWN_X:, :self.__count]
+        erasing = np.flatnonzero(drawn)
+        fillers = self.__fillers
+        blits = [(fillers[slot], (left, top)) for slot, left, top in zip(erasing.tolist(), drawn_x[erasing].tolist(), drawn_y[erasing].tolist())]
+        RenderQueue().draw_many(RenderQueue.ERASE, blits, self.__areas(erasing, drawn_x[erasing], drawn_y[erasing]))
+        drawn[erasing] = 0
+
+    def __areas(self, slots: np.ndarray, lefts: np.ndarray, tops: np.ndarray) -> List[Rect]:
+        """
+        Gets the rects that balls cover when they're drawn somewhere.
+        :param np.ndarray slots: The balls' slots
+        :param np.ndarray lefts: Where the balls are drawn
+        :param np.ndarray tops: Where the balls are drawn
+        :return: List[Rect]
+        """
+        widths, heights = self.__state[Ball.WIDTH, slots], self.__state[Ball.HEIGHT, slots]
+        return [Rect(*area) for area in zip(lefts.tolist(), tops.tolist(), widths.tolist(), heights.tolist())]
 
-    @property
-    def surface(self):
+    def near(self, groups: List[str]) -> List[Any]:
         """
-        Returns the sprite's surface
+        Finds every ball that shares a cell of the spatial hash with a sprite in one of the groups, anywhere in the area
+        it covered during the last physics step, so that only those balls need a precise collision check.
+        :param List[str] groups: The groups in the spatial hash to check the balls against
+        :return: List[Any], the balls near a sprite, in slot order
         """
-        return self._image
+        if not self.__count:
+            return []
 
-    @property
-    def direction(self):
-        return self._direction
+        x, y, width, height, prev_x, prev_y = self.__state[:6, :self.__count]
+        near = SpatialHash().near(groups, np.minimum(x, prev_x), np.minimum(y, prev_y),
+                                  np.maximum(x, prev_x) + width, np.maximum(y, prev_y) + height)
+        return [self.__balls[slot] for slot in np.flatnonzero(near).tolist()]
 
-    @direction.setter
-    def direction(self, new_direction: Tuple[int, int]):
-        self._direction = new_direction
 
+class Ball(Sprite):
+    __slots__ = ("__slot",)
+    # fields of the ball engine's arrays
+    FIELDS = X, Y, WIDTH, HEIGHT, PREV_X, PREV_Y, DIR_X, DIR_Y, SPEED, BASE_SPEED, DRAWN_X, DRAWN_Y, DRAWN = range(13)
+    SERVE_SPEED = 3  # the speed balls start at, which goes up by 1 every time a bat hits them
+    LAYER = RenderQueue.BALLS
+
+    def __init__(self, *args):
+        self.__slot = BallEngine().register(self)
+        super().__init__(*args)
+        BallEngine().set_surfaces(self.__slot, self._image, self._filler_surf)
+        self._base_speed = Ball.SERVE_SPEED
+        self._speed = Ball.SERVE_SPEED
+
+    # --- the attributes Sprite uses are stored in the ball engine, rather than on the object --- #
     @property
-    def base_speed(self):
-        return self._base_speed
+    def _rect(self) -> Rect:
+        engine = BallEngine()
+        return Rect(engine.get(Ball.X, self.__slot), engine.get(Ball.Y, self.__slot),
+                    engine.get(Ball.WIDTH, self.__slot), engine.get(Ball.HEIGHT, self.__slot))
+
+    @_rect.setter
+    def _rect(self, new_rect: Rect):
+        engine = BallEngine()
+        for field, value in zip((Ball.X, Ball.Y, Ball.WIDTH, Ball.HEIGHT), new_rect):
+            engine.set(field, self.__slot, value)
 
     @property
-    def speed(self):
-        return self._speed
+    def _prev_rect(self) -> Rect:
+        engine = BallEngine()
+        return Rect(engine.get(Ball.PREV_X, self.__slot), engine.get(Ball.PREV_Y, self.__slot),
+                    engine.get(Ball.WIDTH, self.__slot), engine.get(Ball.HEIGHT, self.__slot))
 
-    @speed.setter
-    def speed(self, new_speed):
-        self._speed = new_speed
+    @_prev_rect.setter
+    def _prev_rect(self, new_rect: Rect):
+        engine = BallEngine()
+        engine.set(Ball.PREV_X, self.__slot, new_rect[0])
+        engine.set(Ball.PREV_Y, self.__slot, new_rect[1])
 
     @property
-    def rect(self):
-        return self._rect
+    def _direction(self) -> Tuple[int, int]:
+        return BallEngine().get(Ball.DIR_X, self.__slot), BallEngine().get(Ball.DIR_Y, self.__slot)
+
+    @_direction.setter
+    def _direction(self, new_direction: Tuple[int, int]):
+        BallEngine().set(Ball.DIR_X, self.__slot, new_direction[0])
+        BallEngine().set(Ball.DIR_Y, self.__slot, new_direction[1])
 
     @property
-    def prev_rect(self):
-        return self._prev_rect
+    def _speed(self) -> int:
+        return BallEngine().get(Ball.SPEED, self.__slot)
+
+    @_speed.setter
+    def _speed(self, new_speed: int):
+        BallEngine().set(Ball.SPEED, self.__slot, new_speed)
 
     @property
-    def velocity(self):
-        return self._direction[0] * self._speed, self._direction[1] * self._speed
+    def _base_speed(self) -> int:
+        return BallEngine().get(Ball.BASE_SPEED, self.__slot)
 
+    @_base_speed.setter
+    def _base_speed(self, new_base_speed: int):
+        BallEngine().set(Ball.BASE_SPEED, self.__slot, new_base_speed)
 
-class Cat(Sprite):
-    def __init__(self, *args):
-        super().__init__(*args)
-        self.__queued_action = ()
-        self.__scale_size = (self._image.get_width() - 13, self._image.get_height() - 13)
-        self._rect = Rect(randrange(100, self._surface.get_width() - 100),
-                          randrange(0, self._surface.get_height() - self._image.get_height()),
-                          self._rect[2], self._rect[3])
-        self.__internal_timer = datetime.now()
-        self.__rotation = 0
-        self.__cat_type = args[1][0][args[1][0].rindex("/") + 1: args[1][0].rindex(".")]
+    @property
+    def velocity(self):
+        return self._direction[0] * self._speed, self._direction[1] * self._speed  # the engine changes the speed itself
 
-    def enlarge(self, mod_scale_x: int, mod_scale_y: int, scale_limit: Tuple[int, int]) -> None:
+    def move_pos(self, x: int, y: int, update_prev_rect: bool = True) -> None:
         """
-        Slowly enlarges or shrinks the image.
-        :param int mod_scale_x: How much to change the scale size, in the x-direction, by.
-        :param int mod_scale_y: How much to change the scale size, in the y-direction, by.
-        :param Tuple[int, int] scale_limit: The point at which the sprite cannot enlarge or shrink any further.
-        :return: bool, whether the image has finished appearing/enlarging or not.
+        Moves the ball relative to where it is. Unlike other sprites, the ball engine takes care of erasing and redrawing
+        it, and of keeping it on the screen.
+        :param int x: x modifier
+        :param int y: y modifier
+        :param bool update_prev_rect: Whether we change the previous rect during a movement.
+        :return: None
         """
-        if (datetime.now() - self.__internal_timer).total_seconds() > 0.05 and self.__rotation % 360 == 0:
-            self.__scale_size = (max(self.__scale_size[0] + mod_scale_x, self._image.get_width() - 13), max(self.__scale_size[1] + mod_scale_y, self._image.get_height() - 13))
-            self.move_pos(-mod_scale_x, -mod_scale_y, False)
-            self._surface.blit(pygame.transform.scale(self._image, self.__scale_size), self._rect)
-
-            if self.__scale_size == scale_limit:
-                self.__queued_action = self.queued_action[4:]
+        if update_prev_rect:
+            self._prev_rect = self._rect
 
-                if mod_scale_x < 0:  # if the sprite was shrinking, then reposition the sprite once disappeared
-                    self.move_pos(randrange(100, self._surface.get_width() - 100) - self._rect[0],
-                                  randrange(0, self._surface.get_height() - self._image.get_height()) - self._rect[1])
+        self.move_to(self._rect.left + x, self._rect.top + y)
 
-            self.__internal_timer = datetime.now()
+    def move_to(self, left: int, top: int) -> None:
+        """
+        Changes where the ball is during the current physics step, keeping where it started the step. The ball engine
+        takes care of erasing and redrawing it.
+        :param int left: The new x-coordinate of the ball
+        :param int top: The new y-coordinate of the ball
+        :return: None
+        """
+        BallEngine().set(Ball.X, self.__slot, left)
+        BallEngine().set(Ball.Y, self.__slot, top)
 
-        elif self.__rotation % 360 != 0:
-            self.rotate()
+    def place(self, left: int, top: int) -> None:
+        """
+        Puts the ball somewhere new, without it being drawn moving there.
+        :param int left: The new x-coordinate of the ball
+        :param int top: The new y-coordinate of the ball
+        :return: None
+        """
+        self.move_to(left, top)
+        BallEngine().set(Ball.PREV_X, self.__slot, left)
+        BallEngine().set(Ball.PREV_Y, self.__slot, top)
 
-    def rotate(self, degrees: int = 1) -> None:
+    def draw(self, outline: bool = False) -> None:
         """
-        Rotate a cat by a certain amount of degrees.
-        :param int degrees: The amount of degrees to rotate object.
+        Draws the ball where it is now, and lets the ball engine know so it can be erased later.
+        :param bool outline: Whether we are drawing the sprites outline or not.
         :return: None
         """
-        self.__rotation += degrees
+        super().draw(outline)
+        BallEngine().set(Ball.DRAWN_X, self.__slot, BallEngine().get(Ball.X, self.__slot))
+        BallEngine().set(Ball.DRAWN_Y, self.__slot, BallEngine().get(Ball.Y, self.__slot))
+        BallEngine().set(Ball.DRAWN, self.__slot, 1)
+
+
+class FrameCapture:
+    """
+    Streams every frame the game presents to a file of raw frames, or through ffmpeg to a video, without holding up
+    the game. Presenting a frame only copies the areas of the screen that changed into one of a ring of preallocated
+    buffers, as the display's own 32-bit pixels, and a background thread pieces the frames back together and writes
+    them out. If every buffer is still waiting to be written, the frame is either dropped, and the one before it written
+    again in its place so the video keeps time, or the game waits for a buffer to come free.
+    """
+    VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".mov", ".avi")  # written through ffmpeg, rather than as raw frames
+    MAX_PENDING = 256  # rects put off by dropped frames, after which the next frame copies the whole screen instead
+
+    def __init__(self, path: str, surface: pygame.Surface, rate: float, buffers: int = 8, block: bool = False):
+        """
+        :param str path: The file to write to, which is encoded by ffmpeg if it ends in one of VIDEO_EXTENSIONS, or is
+        otherwise raw frames, one after another, with the pixel format given by pixel_format
+        :param pygame.Surface surface: The display, which has to be 32-bit
+        :param float rate: The frames per second to give the video
+        :param int buffers: The number of frames that can be waiting to be written at once
+        :param bool block: Whether to wait for a buffer when they're all full, rather than dropping the frame
+        """
+        if surface.get_bytesize() != 4:
+            raise ValueError(f"Frames can only be captured from a 32-bit display, not {surface.get_bitsize()}-bit")
+
+        self.__path = path
+        self.__screen_rect = surface.get_rect()
+        self.__pixel_format = FrameCapture.pixel_format(surface)
+        self.__rate = rate
+        self.__block = block
+        self.__buffers = [np.zeros((surface.get_height(), surface.get_width()), np.uint32) for _ in range(buffers)]
+        self.__free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(buffers):
+            self.__free.put(slot)
+
+        # buffers waiting to be written, as (slot, the areas copied into it, the frames dropped just before it)
+        self.__filled: "queue.Queue[Optional[Tuple[int, List[Tuple[int, int, int, int]], int]]]" = queue.Queue()
+        self.__pending: List[Rect] = [Rect(self.__screen_rect)]  # areas to copy with the next frame that isn't dropped
+        self.__skipped = 0
+        self.__stats = {"captured": 0, "dropped": 0, "written": 0, "stalls": 0, "stall_ms": 0.0, "max_backlog": 0}
+        self.__capture_times: Deque[float] = deque(maxlen=10000)  # ms each frame took to capture, not counting stalls
+        self.__error: Optional[BaseException] = None
+
+        self.__encoder: Optional[subprocess.Popen] = None
+        if path.lower().endswith(FrameCapture.VIDEO_EXTENSIONS):
+            ffmpeg = shutil.which("ffmpeg")
+            if ffmpeg is None:
+                raise RuntimeError(f"Capturing to {path} needs ffmpeg on the PATH, otherwise capture to a .raw file")
+
+            self.__encoder = subprocess.Popen([ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt",
+                                               self.__pixel_format, "-s", f"{surface.get_width()}x{surface.get_height()}",
+                                               "-r", f"{rate:g}", "-i", "-", "-pix_fmt", "yuv420p", path],
+                                              stdin=subprocess.PIPE)
+            self.__output = self.__encoder.stdin
+
+        else:
+            self.__output = open(path, "wb")
+
+        self.__worker: Optional[threading.Thread] = threading.Thread(target=self.__write_frames, name="capture",
+                                                                     daemon=True)
+        self.__worker.start()
 
-        rotated_image = pygame.transform.rotate(self._image, self.__rotation)
-        self._filler_surf = rotated_image.copy()
-        self._filler_surf.fill(WHITE)
-        self._rect = Rect(self._rect.left, self._rect.top, rotated_image.get_width(), rotated_image.get_height())
+    @staticmethod
+    def pixel_format(surface: pygame.Surface) -> str:
+        """
+        Gets the name ffmpeg gives the order of a 32-bit surface's bytes in memory, e.g. bgr0.
+        :param pygame.Surface surface: The surface
+        :return: str
+        """
+        channels = ["0"] * 4
+        for channel, shift, mask in zip("rgba", surface.get_shifts(), surface.get_masks()):
+            if mask:
+                channels[shift // 8 if sys.byteorder == "little" else 3 - shift // 8] = channel
 
-        self._surface.blit(self._filler_surf, self._rect)
-        self._surface.blit(rotated_image, self._rect)
+        return "".join(channels)
 
-    def activate(self):
+    def capture(self, surface: pygame.Surface, rects: List[Rect]) -> None:
         """
-        Makes the cat power-up active, which means that it will begin to appear on the screen. However, if it's already
-        active/on the screen, then it will need to disappear.
+        Copies the areas of a frame that changed into a free buffer, to be written in the background.
+        :param pygame.Surface surface: The display, once the frame has been presented
+        :param List[Rect] rects: The areas of the display that changed this frame
+        :return: None
         """
-        # condition prevents cat from shrinking when enlarging, whilst ensuring that cat can shrink when enlarged
-        if self.__scale_size == self._image.get_size() or self.__scale_size == (self._image.get_width() - 13, self._image.get_height() - 13):
-            self.__queued_action = (self.enlarge, -1, -1, (self._image.get_width() - 13, self._image.get_height() - 13), self.enlarge, 1, 1, self._image.get_size(), self.rotate) if self.__queued_action else (self.enlarge, 1, 1, self._image.get_size(), self.rotate)
-
-    def reset(self) -> None:
+        start = time.perf_counter()
+        rects = self.__pending + rects
+        try:
+            slot = self.__free.get_nowait()
+
+        except queue.Empty:
+            if not self.__block:
+                self.__pending = rects if len(rects) <= FrameCapture.MAX_PENDING else [Rect(self.__screen_rect)]
+                self.__skipped += 1
+                self.__stats["dropped"] += 1
+                self.__capture_times.append((time.perf_counter() - start) * 1000)
+                return
+
+            slot = self.__free.get()
+            stalled = time.perf_counter()
+            self.__stats["stalls"] += 1
+            self.__stats["stall_ms"] += (stalled - start) * 1000
+            start = stalled
+
+        buffer = self.__buffers[slot]
+        pixels = pygame.surfarray.pixels2d(surface).T  # a view of the display, locking it until it's deleted
+        # a single copy of the whole screen beats many smaller ones once they add up to half of it, as they overlap
+        if sum([rect.width * rect.height for rect in rects]) * 2 >= self.__screen_rect.width * self.__screen_rect.height:
+            rects = [self.__screen_rect]
+
+        areas = []
+        for rect in rects:
+            rect = rect.clip(self.__screen_rect)
+            if rect.width and rect.height:
+                buffer[rect.top:rect.bottom, rect.left:rect.right] = pixels[rect.top:rect.bottom, rect.left:rect.right]
+                areas.append((rect.top, rect.bottom, rect.left, rect.right))
+
+        del pixels
+        self.__filled.put((slot, areas, self.__skipped))
+        self.__pending, self.__skipped = [], 0
+        self.__stats["captured"] += 1
+        self.__stats["max_backlog"] = max(self.__stats["max_backlog"], self.__filled.qsize())
+        self.__capture_times.append((time.perf_counter() - start) * 1000)
+
+    def __write_frames(self) -> None:
         """
-        Resets relevant cat attributes in order for re-use.
+        Runs on the capture thread, applying each captured frame's changes to a copy of the screen, and writing it out,
+        until the capture is closed.
         :return: None
         """
-        self.__scale_size = (self._image.get_width() - 13, self._image.get_height() - 13)
-        self.__queued_action = ()
-        self.__rotation = 0
-        self._surface.blit(self._filler_surf, self._rect)
+        canvas = np.zeros_like(self.__buffers[0])
+        while (frame := self.__filled.get()) is not None:
+            slot, areas, skipped = frame
+            # the dropped frames are filled in with the frame before them, as it's all there is of them
+            self.__write(canvas, skipped)
+            buffer = self.__buffers[slot]
+            for top, bottom, left, right in areas:
+                canvas[top:bottom, left:right] = buffer[top:bottom, left:right]
+
+            self.__free.put(slot)
+            self.__write(canvas, 1)
+
+    def __write(self, canvas: np.ndarray, times: int) -> None:
+        """
+        Writes a frame out, unless writing has already failed, in which case frames are still taken from the ring, so
+        that a blocking capture can't get stuck.
+        :param np.ndarray canvas: The frame
+        :param int times: How many times to write it
+        :return: None
+        """
+        for _ in range(times):
+            if self.__error is not None:
+                return
 
-    @property
-    def queued_action(self):
-        return self.__queued_action
+            try:
+                self.__output.write(canvas.data)
+                self.__stats["written"] += 1
 
-    @queued_action.setter
-    def queued_action(self, new_queue):
-        self.__queued_action = new_queue
+            except OSError as error:  # e.g. ffmpeg has stopped
+                self.__error = error
 
-    @property
-    def cat_type(self) -> str:
-        return self.__cat_type
+    def close(self) -> None:
+        """
+        Waits for every captured frame to be written, then closes the file or waits for ffmpeg to finish.
+        :return: None
+        """
+        if self.__worker is None:
+            return
 
-    @property
-    def rotation(self):
-        return self.__rotation
+        self.__filled.put(None)
+        self.__worker.join()
+        self.__worker = None
+        try:
+            self.__output.close()
 
-    @rotation.setter
-    def rotation(self, new_rotation):
-        self.__rotation = new_rotation
+        except OSError as error:
+            self.__error = self.__error or error
+
+        if self.__encoder is not None and self.__encoder.wait() != 0 and self.__error is None:
+            self.__error = RuntimeError(f"ffmpeg exited with code {self.__encoder.returncode}")
 
     @property
-    def scale_size(self):
-        return self.__scale_size
+    def stats(self) -> Dict[str, Any]:
+        """
+        How many frames have been captured, dropped and written, how many times and for how long the game had to wait for
+        a free buffer, the most frames that were waiting to be written at once, and the mean and longest milliseconds a
+        frame took to capture in the game loop, not counting waiting.
+        """
+        times = self.__capture_times
+        return {**self.__stats, "capture_ms": sum(times) / len(times) if times else 0.0,
+                "capture_max_ms": max(times, default=0.0), "error": str(self.__error) if self.__error else None}
 
-    @scale_size.setter
-    def scale_size(self, new_scale):
-        self.__scale_size = new_scale
+    @property
+    def description(self) -> str:
+        """
+        What was written where, with what it takes to read raw frames back, e.g. for ffmpeg's -f rawvideo.
+        """
+        if self.__encoder is not None:
+            return self.__path
 
+        return (f"{self.__path} (raw {self.__screen_rect.width}x{self.__screen_rect.height} {self.__pixel_format} "
+                f"frames at {self.__rate:g} fps)")
 
-class Player(Sprite):
-    def __init__(self, *args):
-        super().__init__(*args)
-        # --- Rotate paddles --- #
-        self._image = pygame.transform.rotate(self._image, 90)
-        self._image_outline = pygame.transform.rotate(self._image_outline, 90)
-        self._filler_surf = pygame.transform.rotate(self._filler_surf, 90)
-        self._rect = Rect(self._rect[0], self._rect[1], self._image.get_width(), self._image.get_height())
-
-        self._base_speed = 7
-        self._speed = 7
-        self._direction = (0, 1)
-        self.__score = 0
 
-    @property
-    def score(self) -> int:
-        return self.__score
+class InputLog:
+    """
+    A recording of a game: the seed of its RNG, and the state of the controls during every frame. Frames are stored as
+    one byte of flags each, run-length encoded, since the controls rarely change from one frame to the next.
+    """
+    MAGIC = b"NUGJ"
+    HEADER = struct.Struct("<4sBQI20s")  # magic, version, seed, frame count, digest of the final game state
+    RUN = struct.Struct("<BH")  # controls, number of frames
+    W, S, UP, DOWN, ESCAPE = (1 << bit for bit in range(5))
 
-    @score.setter
-    def score(self, new_score):
-        self.__score = new_score
+    def __init__(self, seed: int, frames: List[int] = None, digest: bytes = bytes(20)):
+        self.seed = seed
+        self.frames = frames if frames is not None else []
+        self.digest = digest
 
+    def save(self, path: str) -> None:
+        """
+        Writes the recording to a file.
+        :param str path: Where to save the recording
+        :return: None
+        """
+        runs = []
+        for controls, run in itertools.groupby(self.frames):
+            length = sum(1 for _ in run)
+            while length:
+                runs.append(InputLog.RUN.pack(controls, min(length, 0xFFFF)))
+                length -= min(length, 0xFFFF)
 
-class Ball(Sprite):
-    def __init__(self, *args):
-        super().__init__(*args)
-        self._base_speed = 3
-        self._speed = 3
+        with open(path, "wb") as file:
+            file.write(InputLog.HEADER.pack(InputLog.MAGIC, 1, self.seed, len(self.frames), self.digest))
+            file.write(b"".join(runs))
 
-    def move_pos(self, x: int, y: int, update_prev_rect: bool = True) -> int:
+    @staticmethod
+    def load(path: str) -> "InputLog":
         """
-        The same functionality as in the parent class, but also checks if we hit screen boundaries.
-        :return: int, which player has scored, 0 denoting that no one has scored yet.
+        Reads a recording from a file.
+        :param str path: The file to read
+        :return: InputLog
         """
-        super(Ball, self).move_pos(x, y, update_prev_rect)
-
-        if self._rect[1] == 0 or self._rect[1] == self._surface.get_height() - self._rect.height:
-            self._direction = (self._direction[0], -self._direction[1])
-            Beep(441, 16)
+        with open(path, "rb") as file:
+            data = file.read()
 
-        elif self._rect[0] == 0:
-            self._direction = (0, 0)
-            self._speed = self._base_speed
-            return 2
+        magic, version, seed, frame_count, digest = InputLog.HEADER.unpack_from(data)
+        if magic != InputLog.MAGIC or version != 1:
+            raise ValueError(f"{path} isn't a recording made by this version of the game")
 
-        elif self._rect[0] == self._surface.get_width() - self._rect.width:
-            self._direction = (0, 0)
-            self._speed = self._base_speed
-            return 1
+        frames = []
+        for controls, length in InputLog.RUN.iter_unpack(data[InputLog.HEADER.size:]):
+            frames.extend([controls] * length)
 
-        return 0
+        return InputLog(seed, frames[:frame_count], digest)
 
 
 class Game:
-    def __init__(self):
+    CONTROL_KEYS = {K_w, K_s, K_UP, K_DOWN}
+    BAT_CONTROLS = ((InputLog.W, InputLog.S), (InputLog.UP, InputLog.DOWN))  # the up and down flags of each bat
+
+    def __init__(self, headless: bool = False, resolution: Tuple[int, int] = None, fps: int = FPS,
+                 dirty_rects: bool = True, ball_count: int = 15, frame_ms: float = None, seed: int = None,
+                 record: str = None, replay: str = None, profile: str = None,
+                 controls: Callable[["Game"], int] = None, cat_weights: Dict[str, int] = None, native: bool = False,
+                 threaded: bool = False, capture: str = None, trails: bool = True):
+        """
+        :param bool headless: Whether to run without a real display or audio, e.g. for benchmarks and automated runs.
+        :param Tuple[int, int] resolution: The size the game is drawn at, defaults to INTERNAL_RESOLUTION, or the
+        display's own resolution when native.
+        :param int fps: The frame cap, where 0 runs the game as fast as possible.
+        :param bool dirty_rects: Whether to only update the changed areas of the display, rather than all of it.
+        :param int ball_count: The number of balls in the pool, which caps how many can be in play at once.
+        :param float frame_ms: If given, game time advances by this many milliseconds every frame, instead of following
+        the real clock, which makes timings deterministic.
+        :param int seed: The seed of the game's randomness, random by default. Any integer will do, and is taken modulo
+        2**64, which is what recordings and the particles' randomness can hold.
+        :param str record: If given, the game is recorded to this file when it ends, so that it can be replayed.
+        Recording makes time advance a physics step every frame.
+        :param str replay: If given, a recording to play back instead of reading the controls. Replays run headless as
+        fast as possible, and override the other options.
+        :param str profile: If given, every phase of every frame is timed, and the timings are written to this file
+        when the game ends, as Chrome trace events if it ends in .json, or otherwise as CSV. Press F3 to show the
+        timings on screen, whether or not this is given.
+        :param Callable[[Game], int] controls: If given, called every frame to get the controls (a combination of the
+        InputLog flags) instead of asking the bats' controllers, e.g. for controls sent over the network.
+        :param Dict[str, int] cat_weights: How likely each cat type is to spawn, defaults to CAT_WEIGHTS.
+        :param bool native: Whether to draw at the display's own resolution, rather than drawing at a fixed resolution
+        that's scaled up to fill the display in a single hardware blit. Drawing natively costs more per frame the bigger
+        the display is, and the game plays differently on different displays.
+        :param bool threaded: Whether to simulate each frame on a thread of its own, while the main thread draws and
+        presents the frame before it. Frames are simulated in step with the main thread, so the game plays out exactly
+        as it does on one thread, only shown a frame later.
+        :param str capture: If given, every frame presented is streamed to this file in the background, as a video
+        through ffmpeg if it ends in one of FrameCapture.VIDEO_EXTENSIONS, otherwise as raw frames. Headless games wait
+        for frames to be written rather than dropping them, as nobody's waiting on the frame rate.
+        :param bool trails: Whether balls leave trails of particles, which only the first ParticleSystem.MAX_TRAILS balls
+        in play do.
+        """
         self.__running = True
-        self.__surface = pygame.display.set_mode([0, 0], pygame.FULLSCREEN)
-        self.__timer = datetime(2000, 1, 1, 0, 0, 0, 0)
+        self.__controls_source = controls
+        # a cat type is picked from this list, so that the weights are applied with a single draw of the RNG
+        self.__cat_spawns = [cat_type for cat_type, weight in (cat_weights or CAT_WEIGHTS).items() for _ in range(weight)]
+        self.__stats = {"bat_hits": 0, "rallies": [], "cat_spawns": {f"{cat_type} Cat": 0 for cat_type in CAT_TYPES},
+                        "cat_hits": {f"{cat_type} Cat": 0 for cat_type in CAT_TYPES}}
+        self.__rally = 0  # bat hits since the last point
+        self.__record = record
+        self.__profile = profile
+        self.__replay = InputLog.load(replay) if replay else None
+        if self.__replay is not None:
+            headless, resolution, fps, dirty_rects, frame_ms = True, None, 0, True, PHYSICS_STEP_MS
+            seed = self.__replay.seed
+
+        elif record:
+            frame_ms = PHYSICS_STEP_MS
+
+        self.__seed = seed & (2 ** 64 - 1) if seed is not None else int.from_bytes(os.urandom(8), "little")
+        RNG.seed(self.__seed)
+        self.__input_log = InputLog(self.__seed)
+        self.__controls = 0
+        self.__input_times: List[float] = []  # when each control key event this frame's controls include was handled
+        self.__applied_times: List[float] = []  # the same, for events that physics has used and are waiting to be seen
+        self.__input_latency: Deque[float] = deque(maxlen=10000)  # ms from handling an event to presenting its effect
+        # ms spent each frame simulating, and on the main thread handling events, drawing and presenting
+        self.__thread_times: Dict[str, Deque[float]] = {"simulation": deque(maxlen=10000), "main": deque(maxlen=10000)}
+        self.__threaded = threaded
+        self.__trails = trails
+        self.__simulation: Optional[threading.Thread] = None
+        self.__frame_wanted = threading.Semaphore(0)  # released by the main thread for each frame it wants simulated
+        self.__frame_ready = threading.Semaphore(0)  # released by the simulation thread once it's simulated one
+        self.__simulation_error: Optional[BaseException] = None
+        # the snapshot of the frame to draw next, with the times of the inputs that it's the first to show, and the same
+        # for the frame the simulation thread is working on
+        self.__front: Tuple[Tuple, List[float]] = ((), [])
+        self.__back: Tuple[Tuple, List[float]] = ((), [])
+        self.__fps = fps
+        if headless:
+            # SDL's dummy drivers need to be picked before the display gets (re)initialised.
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+            pygame.display.quit()
+            pygame.display.init()
+            self.__surface = pygame.display.set_mode(resolution or INTERNAL_RESOLUTION)
+
+        elif native:
+            self.__surface = pygame.display.set_mode(resolution or [0, 0], pygame.FULLSCREEN)
+
+        else:
+            # SDL keeps the aspect ratio when it scales, adding black bars if the display's is different
+            self.__surface = pygame.display.set_mode(resolution or INTERNAL_RESOLUTION, pygame.FULLSCREEN | pygame.SCALED)
+
+        DirtyRectManager().reset(self.__surface, dirty_rects)
+        RenderQueue().reset(self.__surface)
+        self.__capture = FrameCapture(capture, self.__surface, 1000 / frame_ms if frame_ms else fps or FPS,
+                                      block=headless) if capture else None
+        SoundManager().reset("null" if headless else "mixer")
+        Profiler().reset(enabled=bool(profile), trace=bool(profile))
+        self.__countdown_timer = None
+        self.__spawn_timer = None
+        self.__accumulator = 0.0  # time that's passed, but hasn't been simulated by a physics step yet
+        self.__last_time = 0.0
         self.__countdown_values = ["3", "2", "1", "GO!", ""]
 
         self.__collision_manager = CollisionManager()
         self.__sprite_manager = SpriteManager()
+        SpatialHash().reset()
+        AnimationCache().reset()
+        AssetManager().reset(self.__surface)
+        ParticleSystem().reset(self.__surface, seed=self.__seed, trails=self.__trails)
+        Scheduler().reset(frame_ms)
+        BallEngine().reset(self.__surface, ball_count)
 
         for cat_type in CAT_TYPES:
             self.__sprite_manager.add_objects(f"{cat_type} Cat", Cat, 5, self.__surface,
-                                              [f"Graphics/{cat_type} Cat.png", ""], (0, 0))
+                                              [f"Graphics/{cat_type} Cat.png", ""], (0, 0), grid_group="Cat", limit=5)
+
+        self.__cats = list(self.__get_cats())
 
         for i in range(1, 3):  # repeats for stop - start number of players
             self.__sprite_manager.add_objects(f"Player{i}", Player, 1, self.__surface,
                                               ["Graphics/bat.png", "Graphics/bat_outline.png"],
-                                              (0, 0))
+                                              (0, 0), grid_group="Bat", limit=1)
+            self.__sprite_manager.acquire(f"Player{i}")
+
+        self.__bats = [self.__sprite_manager.object_pool["Player1"][0], self.__sprite_manager.object_pool["Player2"][0]]
 
-        self.__sprite_manager.add_objects("Ball", Ball, 15, self.__surface,
+        self.__sprite_manager.object_pool["Player1"][0].controller = KeyboardController(K_w, K_s)
+        self.__sprite_manager.object_pool["Player2"][0].controller = KeyboardController(K_UP, K_DOWN)
+
+        # balls are only active while they're in play
+        self.__sprite_manager.add_objects("Ball", Ball, ball_count, self.__surface,
                                           ["Graphics/ball.png", "Graphics/ball_outline.png"],
-                                          (0, 0))
+                                          (0, 0), limit=ball_count)
+        BallEngine().adopt(self.__sprite_manager.object_pool["Ball"])
 
         # Text 0: FPS, Text 1: Reset Countdown, Text 2: Player1 Score, Text3: Player2 Score, Text4: Exit Notice
         self.__sprite_manager.add_objects("Text", Text, 5, self.__surface,
@@ -471,19 +2765,36 @@ class Game:
 
     def __countdown(self) -> None:
         """
-        Countdown until game restarts.
+        Countdown until game restarts, moving on to the next value every second.
+        :return: None
+        """
+        self.__sprite_manager.object_pool["Text"][1].update_text(self.__countdown_values[self.__countdown_values.index(self.__sprite_manager.object_pool["Text"][1].message) + 1], True)
+
+        if self.__sprite_manager.object_pool["Text"][1].message:
+            self.__countdown_timer = Scheduler().schedule(1000, self.__countdown)
+
+        else:
+            self.__end_countdown()
+
+    def __end_countdown(self) -> None:
+        """
+        Starts the round, once the countdown has finished.
         :return: None
         """
-        # if a second has elapsed
-        if (datetime.now() - self.__timer).total_seconds() > 1:
-            self.__sprite_manager.object_pool["Text"][1].update_text(self.__countdown_values[self.__countdown_values.index(self.__sprite_manager.object_pool["Text"][1].message) + 1], True)
-            self.__timer = datetime.now()
+        self.__countdown_timer = None
+        self.__sprite_manager.object_pool["Text"][2].color = (0, 0, 0)
+        self.__sprite_manager.object_pool["Text"][3].color = (0, 0, 0)
+        self.__spawn_timer = Scheduler().schedule(2500, self.__spawn_cats)
 
-            # have to chain if here so we can change the colour of the scores once, instead of setting it during
-            # every cycle
-            if not self.__sprite_manager.object_pool["Text"][1].message:
-                self.__sprite_manager.object_pool["Text"][2].color = (0, 0, 0)
-                self.__sprite_manager.object_pool["Text"][3].color = (0, 0, 0)
+    def skip_countdown(self) -> None:
+        """
+        Ends the countdown straight away, so that the round begins on the next frame.
+        :return: None
+        """
+        if self.__countdown_timer is not None:
+            Scheduler.cancel(self.__countdown_timer)
+            self.__sprite_manager.object_pool["Text"][1].update_text("", True)
+            self.__end_countdown()
 
     def __reset_game(self) -> None:
         """
@@ -496,115 +2807,282 @@ class Game:
         self.__sprite_manager.object_pool["Player2"][0].move_pos(self.__surface.get_width() - 50 - self.__sprite_manager.object_pool["Player2"][0].rect.left,
                                                                  (self.__surface.get_height() // 2) - (self.__sprite_manager.object_pool["Player2"][0].surface.get_height() // 2) - self.__sprite_manager.object_pool["Player2"][0].rect.top)
 
-        self.__sprite_manager.object_pool["Ball"][0].move_pos((self.__surface.get_width() // 2) - self.__sprite_manager.object_pool["Ball"][0].rect.left,
-                                                              (self.__surface.get_height() // 2) - self.__sprite_manager.object_pool["Ball"][0].rect.top)
+        BallEngine().erase()
+        ParticleSystem().clear()
+        for ball in list(self.__sprite_manager.active("Ball")):
+            ball.direction = (0, 0)
+            self.__sprite_manager.release("Ball", ball)
+
+        serve = self.__sprite_manager.acquire("Ball")
+        serve.place(self.__surface.get_width() // 2, self.__surface.get_height() // 2)
 
         self.__sprite_manager.object_pool["Player1"][0].draw(True)  # Player 1
         self.__sprite_manager.object_pool["Player2"][0].draw(True)  # Player 2
-        self.__sprite_manager.object_pool["Ball"][0].draw(True)  # Ball 1
+        serve.draw(True)  # Ball 1
 
         # resets all cats that are either enlarging or shrinking, or have a different rotation
-        cats_onscreen = filter(lambda x: x.scale_size != (x.surface.get_width() - 13, x.surface.get_height() - 13), self.__get_cats())
+        cats_onscreen = filter(lambda x: x.scale_size != (x.surface.get_width() - 13, x.surface.get_height() - 13), list(self.__get_active_cats()))
         for cat in cats_onscreen:
             cat.reset()
 
-        self.__sprite_manager.object_pool["Ball"][0].speed = self.__sprite_manager.object_pool["Ball"][0].base_speed
-        self.__sprite_manager.object_pool["Ball"][0].direction = (choice([1, -1]), choice([1, -1]))
+        serve.speed = serve.base_speed
+        serve.direction = (RNG.choice([1, -1]), RNG.choice([1, -1]))
 
-        # --- kickstart the countdown
+        # --- kickstart the countdown, and stop spawning cats until it's over
         self.__sprite_manager.object_pool["Text"][1].update_text("3", True)
-        self.__timer = datetime.now()
+        Scheduler.cancel(self.__countdown_timer)
+        Scheduler.cancel(self.__spawn_timer)
+        self.__countdown_timer = Scheduler().schedule(1000, self.__countdown)
+        self.__spawn_timer = None
 
         self.__sprite_manager.object_pool["Text"][2].color = FADED_BLACK
         self.__sprite_manager.object_pool["Text"][3].color = FADED_BLACK
 
     def __spawn_cats(self) -> None:
         """
-        Randomly places a cat on a particular area of the screen.
+        Randomly places a cat on a particular area of the screen, every 2.5 seconds.
         :return: None
         """
-        if (datetime.now() - self.__timer).total_seconds() > 2.5:  # every 2.5 amount of seconds
-            # randomly choose a cat of varying probability, and make it appear at a random point on the screen.
-            cat_type = choice((['White'] * 35) + (["Red"] * 20) + (["Green"] * 20) + (["Blue"] * 20) + (["Black"] * 5))
-            self.__sprite_manager.object_pool[f"{cat_type} Cat"][randrange(0, len(self.__sprite_manager.object_pool[f"{cat_type} Cat"]))].activate()
-            self.__timer = datetime.now()
+        # randomly choose a cat of varying probability, and make it appear at a random point on the screen. Each cat of
+        # the type is as likely to be picked, so a cat that's already on the screen may be picked, in which case it
+        # shrinks away and reappears somewhere else.
+        cat_type = RNG.choice(self.__cat_spawns)
+        on_screen = list(self.__sprite_manager.active(f"{cat_type} Cat"))
+        picked = RNG.randrange(len(self.__sprite_manager.object_pool[f"{cat_type} Cat"]))
+        if picked < len(on_screen):
+            on_screen[picked].activate()
+
+        else:
+            self.activate_cat(cat_type)
+
+        self.__stats["cat_spawns"][f"{cat_type} Cat"] += 1
+
+        self.__spawn_timer = Scheduler().schedule(2500, self.__spawn_cats)
+
+    def activate_cat(self, cat_type: str) -> Optional[Cat]:
+        """
+        Takes a free cat of the given type out of its pool, and activates it.
+        :param str cat_type: The type of cat to activate, out of CAT_TYPES
+        :return: Optional[Cat], the activated cat, or None if every cat of that type is already on the screen
+        """
+        cat = self.__sprite_manager.acquire(f"{cat_type} Cat")
+        if cat is not None:
+            cat.activate()
+
+        return cat
 
     def __check_cats(self) -> None:
         """
         Checks whether any actions need performing from a cat object.
         :return: None
         """
-        for active_cat in filter(lambda x: x.queued_action is not None, self.__get_cats()):
-            # checks whether the type of function queued, if any, and if it has more than 1 parameter we know to enlarge
-            if active_cat.queued_action and len(str(signature(active_cat.queued_action[0]))[1:-1].split(", ")) > 1:
-                active_cat.queued_action[0](active_cat.queued_action[1], active_cat.queued_action[2], active_cat.queued_action[3])
+        for cat_type in CAT_TYPES:
+            for active_cat in list(self.__sprite_manager.active(f"{cat_type} Cat")):
+                if active_cat.state == Cat.HIDDEN:  # cats that have been hit or reset go back to the pool
+                    self.__sprite_manager.release(f"{cat_type} Cat", active_cat)
 
-            # otherwise, if there's a function queued, then it's only the rotate method left.
-            elif active_cat.queued_action:
-                active_cat.queued_action[0]()
+                else:
+                    active_cat.update()
 
     def __check_events(self) -> None:
         """
-        Checks any pygame events that occur.
+        Handles every pygame event that's queued up since the last frame, then reads this frame's controls, either from
+        the bats' controllers or from the replay. Key presses and releases of the controls are timed from here, to measure how
+        long they take to reach the screen.
         :return: None
         """
-        event = pygame.event.poll()
-        if event.type == KEYDOWN and event.key == K_ESCAPE:
+        escape = False
+        now = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                escape = True
+
+            elif event.type == KEYDOWN and event.key == K_ESCAPE:
+                escape = True
+
+            elif event.type == KEYDOWN and event.key == K_F3:  # toggles the profiler's overlay, and isn't recorded
+                Profiler().overlay = not Profiler().overlay
+                if not Profiler().overlay:
+                    Profiler().erase_overlay(self.__surface)
+
+            elif event.type in (KEYDOWN, KEYUP) and event.key in Game.CONTROL_KEYS:
+                self.__input_times.append(now)
+
+        if self.__replay is not None:
+            frame = len(self.__input_log.frames)
+            if frame == len(self.__replay.frames):  # the replay is over
+                self.__running = False
+                return
+
+            self.__controls = self.__replay.frames[frame]
+
+        elif self.__controls_source is not None:
+            self.__controls = self.__controls_source(self)
+
+        else:
+            self.__controls = InputLog.ESCAPE if escape else 0
+            for i, (up, down) in enumerate(Game.BAT_CONTROLS, 1):
+                bat = self.__sprite_manager.object_pool[f"Player{i}"][0]
+                move = bat.controller.move(self, bat)
+                self.__controls |= up if move < 0 else down if move > 0 else 0
+
+        self.__input_log.frames.append(self.__controls)
+        if self.__controls & InputLog.ESCAPE:
             self.__running = False
 
     def __check_inputs(self) -> None:
         """
-        Checks for any peripheral inputs
+        Moves the bats using this frame's controls
         :return: None
         """
-        keys = pygame.key.get_pressed()
+        controls = self.__controls
 
         self.__sprite_manager.object_pool["Player1"][0].move_pos(0,
-                                                                 self.__sprite_manager.object_pool["Player1"][0].velocity[1] * (-keys[K_w] + keys[K_s]))
+                                                                 self.__sprite_manager.object_pool["Player1"][0].velocity[1] * (-bool(controls & InputLog.W) + bool(controls & InputLog.S)))
 
         self.__sprite_manager.object_pool["Player2"][0].move_pos(0,
-                                                                 self.__sprite_manager.object_pool["Player2"][0].velocity[1] * (-keys[K_UP] + keys[K_DOWN]))
+                                                                 self.__sprite_manager.object_pool["Player2"][0].velocity[1] * (-bool(controls & InputLog.UP) + bool(controls & InputLog.DOWN)))
 
-    def __process(self) -> None:
+    def __advance(self) -> Tuple[Tuple, List[float]]:
         """
-        All the processes of the game occur inside this method.
-        :return: None
+        Simulates a frame, then takes everything it drew out of the render queue.
+        :return: Tuple[Tuple, List[float]], the snapshot of the frame, as taken by RenderQueue.snapshot, and the times of
+        the inputs that it's the first to show
         """
-        self.__check_events()
-        self.__sprite_manager.object_pool["Text"][0].update_text(f"{FPS_CLOCK.get_fps():0.2f} FPS")  # update FPS
-        self.__sprite_manager.object_pool["Text"][2].update_text(f"{self.__sprite_manager.object_pool['Player1'][0].score:02d}", True)  # update Player 1's score
-        self.__sprite_manager.object_pool["Text"][3].update_text(f"{self.__sprite_manager.object_pool['Player2'][0].score:02d}", True)  # update Player 2's score
-        self.__sprite_manager.object_pool["Text"][4].update_text("Press (ESC) to EXIT")
-
-        if self.__sprite_manager.object_pool["Text"][1].message:
-            self.__countdown()
-
-        elif not self.__sprite_manager.object_pool["Text"][1].message:  # else if not counting down, run the game
-            self.__check_inputs()
+        start = time.perf_counter()
+        if self.__running:
+            self.__process()
 
-            # move all balls that have don't have a direction of (0, 0)
-            active_balls = list(filter(lambda x: x.direction != (0, 0), self.__sprite_manager.object_pool["Ball"]))
-            # need the inline-if below to check direction != (0, 0) AGAIN because move_pos might change the direction to
-            # (0, 0) in which case, the ball shouldn't be drawn.
-            player_scores = list(filter(lambda x: x != 0, [(active_ball.move_pos(active_ball.velocity[0], active_ball.velocity[1]), active_ball.draw() if active_ball.direction != (0, 0) else None)[0] for active_ball in active_balls]))
+        profiler = Profiler()
+        profiler.begin("snapshot")
+        frame = (RenderQueue().snapshot(), self.__applied_times)
+        self.__applied_times = []
+        profiler.end("snapshot")
+        self.__thread_times["simulation"].append((time.perf_counter() - start) * 1000)
+        return frame
 
-            self.__spawn_cats()
-            self.__check_cats()
+    def __simulate_frames(self) -> None:
+        """
+        Runs on the simulation thread, simulating a frame every time the main thread asks for one, until the game is
+        closed.
+        :return: None
+        """
+        while True:
+            self.__frame_wanted.acquire()
+            if self.__simulation is None:
+                return
 
-            self.__sprite_manager.object_pool["Player1"][0].draw()  # Player 1
-            self.__sprite_manager.object_pool["Player2"][0].draw()  # Player 2
+            try:
+                self.__back = self.__advance()
 
-            self.__collision_manager.check_bat_ball(self.__sprite_manager.object_pool["Player1"], self.__sprite_manager.object_pool["Ball"])
-            self.__collision_manager.check_bat_ball(self.__sprite_manager.object_pool["Player2"], self.__sprite_manager.object_pool["Ball"])
-            self.__collision_manager.check_ball_cat(self.__sprite_manager.object_pool["Ball"], list(self.__get_cats()), None)
+            except BaseException as error:  # handed over to the main thread, which is waiting for this frame
+                self.__simulation_error = error
 
-            if player_scores:
-                self.__sprite_manager.object_pool["Player1"][0].score += player_scores.count(1)
-                self.__sprite_manager.object_pool["Player2"][0].score += player_scores.count(2)
-                Beep(600, 32)
+            self.__frame_ready.release()
 
-            if len(active_balls) == 0:
-                self.__reset_game()
+    def __process(self) -> None:
+        """
+        All the processes of the game occur inside this method, apart from handling events.
+        :return: None
+        """
+        profiler = Profiler()
+        profiler.begin("text")
+        self.__sprite_manager.object_pool["Text"][0].update_text(f"{FPS_CLOCK.get_fps():0.2f} FPS")  # update FPS
+        self.__sprite_manager.object_pool["Text"][2].update_text(f"{self.__sprite_manager.object_pool['Player1'][0].score:02d}", True)  # update Player 1's score
+        self.__sprite_manager.object_pool["Text"][3].update_text(f"{self.__sprite_manager.object_pool['Player2'][0].score:02d}", True)  # update Player 2's score
+        self.__sprite_manager.object_pool["Text"][4].update_text("Press (ESC) to EXIT")
+        profiler.end("text")
+
+        profiler.begin("scheduler")
+        Scheduler().tick()  # counts down, spawns cats and animates them, when each is due
+        profiler.end("scheduler")
+        elapsed, self.__last_time = Scheduler().now - self.__last_time, Scheduler().now
+
+        if self.__sprite_manager.object_pool["Text"][1].message:  # physics don't run during the countdown
+            self.__accumulator = 0.0
+            self.__input_times.clear()  # so the controls can't do anything, and aren't timed
+            return
+
+        # run as many fixed physics steps as the time since the last frame covers, so the game plays at the same speed
+        # whatever the frame rate. The leeway stops float error from delaying a step when each frame is exactly a step.
+        self.__accumulator += elapsed
+        steps = 0
+        profiler.begin("physics")
+        while self.__accumulator >= PHYSICS_STEP_MS - 1e-6:
+            if steps == MAX_PHYSICS_STEPS:  # too far behind to catch up, so drop the time instead
+                self.__accumulator = 0.0
+                break
+
+            self.__accumulator -= PHYSICS_STEP_MS
+            steps += 1
+            self.__simulate()
+            self.__applied_times += self.__input_times
+            self.__input_times.clear()
+            if self.__sprite_manager.object_pool["Text"][1].message:  # the round has been reset
+                profiler.end("physics")
+                return
+
+        profiler.end("physics")
+
+        # draw the balls part of the way into the next physics step, so their movement stays smooth. These are only
+        # queued, and the render queue's layers decide what ends up on top of what.
+        profiler.begin("draw")
+        ParticleSystem().erase()
+        BallEngine().draw(min(1.0, max(0.0, self.__accumulator / PHYSICS_STEP_MS)))
+        self.__sprite_manager.object_pool["Player1"][0].draw()  # Player 1
+        self.__sprite_manager.object_pool["Player2"][0].draw()  # Player 2
+        ParticleSystem().draw()
+        profiler.end("draw")
+
+    def __simulate(self) -> None:
+        """
+        Advances the game by a single physics step of PHYSICS_STEP_MS.
+        :return: None
+        """
+        profiler = Profiler()
+        profiler.begin("input")
+        self.__check_inputs()
+        profiler.end("input")
+
+        # move all balls that have don't have a direction of (0, 0)
+        profiler.begin("balls")
+        active_balls = BallEngine().advance()
+        profiler.end("balls")
+        profiler.begin("particles")
+        ParticleSystem().emit_trails(*BallEngine().centres())
+        ParticleSystem().update(PHYSICS_STEP_MS)
+        profiler.end("particles")
+        profiler.begin("bat collisions")
+        bat_hits = self.__collision_manager.check_bat_ball(self.__bats, self.__sprite_manager.object_pool["Ball"])
+        self.__stats["bat_hits"] += bat_hits
+        self.__rally += bat_hits
+        profiler.end("bat collisions")
+        profiler.begin("walls")
+        player1_points, player2_points, out_of_play = BallEngine().resolve_walls()
+        for ball in out_of_play:
+            self.__sprite_manager.release("Ball", ball)
+
+        profiler.end("walls")
+
+        profiler.begin("cats")
+        self.__check_cats()
+        profiler.end("cats")
+        profiler.begin("cat collisions")
+        for cat_type in self.__collision_manager.check_ball_cat(self.__sprite_manager.object_pool["Ball"],
+                                                                list(self.__get_active_cats()), self.__sprite_manager):
+            self.__stats["cat_hits"][cat_type] += 1
+
+        profiler.end("cat collisions")
+
+        if player1_points or player2_points:
+            self.__sprite_manager.object_pool["Player1"][0].score += player1_points
+            self.__sprite_manager.object_pool["Player2"][0].score += player2_points
+            SoundManager().play("score")
+            self.__stats["rallies"] += [self.__rally] * (player1_points + player2_points)
+            self.__rally = 0
+
+        if active_balls == 0:
+            self.__reset_game()
 
     def __get_cats(self) -> Iterator:
         """
@@ -613,20 +3091,242 @@ class Game:
         """
         return itertools.chain.from_iterable([self.__sprite_manager.object_pool[f"{cat_type} Cat"] for cat_type in CAT_TYPES])
 
+    def __get_active_cats(self) -> Iterator:
+        """
+        Gets the cat objects of every type that are currently on the screen.
+        :return: Iterator
+        """
+        return itertools.chain.from_iterable([self.__sprite_manager.active(f"{cat_type} Cat") for cat_type in CAT_TYPES])
+
+    def start(self) -> None:
+        """
+        Clears the screen and sets up the first round, ready for frames to be stepped through.
+        :return: None
+        """
+        DirtyRectManager().add(self.__surface.fill((255, 255, 255)))
+        self.__reset_game()
+        if self.__threaded and self.__simulation is None:
+            self.__simulation = threading.Thread(target=self.__simulate_frames, name="simulation", daemon=True)
+            self.__simulation.start()
+
+    def step(self) -> None:
+        """
+        Processes and presents a single frame of the game. When threaded, the frame is simulated on the simulation
+        thread while the frame before it is drawn and presented, which is only ever done while nothing else is running
+        there, so the game can be read and changed between steps just as when it isn't threaded.
+        :return: None
+        """
+        profiler = Profiler()
+        profiler.begin("frame")
+        # wait for the frame cap first, rather than between drawing and presenting, so that the controls are read as
+        # late as possible and the frame goes on the screen as soon as it's drawn
+        profiler.begin("wait")
+        FPS_CLOCK.tick(self.__fps)
+        profiler.end("wait")
+        start = time.perf_counter()
+        profiler.begin("events")
+        self.__check_events()
+        profiler.end("events")
+        profiler.begin("overlay")
+        profiler.draw_overlay(self.__surface)
+        profiler.end("overlay")
+        main_time = time.perf_counter() - start
+        simulating = self.__simulation is not None and self.__running
+        if simulating:
+            self.__frame_wanted.release()
+
+        else:
+            self.__front = self.__advance()
+
+        start = time.perf_counter()
+        profiler.begin("render")
+        RenderQueue().flush(self.__front[0])  # everything drawn in the frame goes onto the screen here, a layer at a time
+        profiler.end("render")
+        profiler.begin("present")
+        presented_rects = DirtyRectManager().present()
+        profiler.end("present")
+        if self.__front[1]:
+            presented = time.perf_counter()
+            self.__input_latency.extend([(presented - handled) * 1000 for handled in self.__front[1]])
+
+        if self.__capture is not None:
+            profiler.begin("capture")
+            self.__capture.capture(self.__surface, presented_rects)
+            profiler.end("capture")
+
+        self.__thread_times["main"].append((main_time + time.perf_counter() - start) * 1000)
+        if simulating:
+            profiler.begin("sync")
+            self.__frame_ready.acquire()
+            profiler.end("sync")
+            if self.__simulation_error is not None:
+                raise self.__simulation_error
+
+            self.__front = self.__back
+
+        profiler.end("frame")
+        profiler.end_frame()
+
+    def close(self) -> None:
+        """
+        Stops the simulation thread, if the game has one, and finishes writing the capture, if it's being captured.
+        :return: None
+        """
+        if self.__simulation is not None:
+            simulation, self.__simulation = self.__simulation, None
+            self.__frame_wanted.release()
+            simulation.join()
+
+        if self.__capture is not None:
+            self.__capture.close()
+
     def run(self) -> None:
         """
         Method to call, in order to run the game
         :return: None
         """
-        self.__surface.fill((255, 255, 255))
-        self.__reset_game()
+        self.start()
 
         while self.__running:
-            self.__process()
-            FPS_CLOCK.tick(FPS)
-            pygame.display.update()
+            self.step()
 
+        self.close()
 
-if __name__ == "__main__":
-    game = Game()
+        if self.__record:
+            self.__input_log.digest = self.state_digest()
+            self.__input_log.save(self.__record)
+
+        if self.__profile:
+            Profiler().export(self.__profile)
+
+    def state_digest(self) -> bytes:
+        """
+        Summarises the state of the game, so that replays can be checked against the game they recorded.
+        :return: bytes, a SHA-1 digest of the scores, and every ball, bat and cat
+        """
+        pool = self.__sprite_manager.object_pool
+        state = [pool["Player1"][0].score, pool["Player2"][0].score, pool["Text"][1].message]
+        state += [(tuple(ball.rect), ball.direction, ball.speed) for ball in pool["Ball"]]
+        state += [tuple(pool[f"Player{i}"][0].rect) for i in range(1, 3)]
+        state += [(tuple(cat.rect), cat.state, cat.rotation, cat.scale_size) for cat in self.__cats]
+        return hashlib.sha1(repr(state).encode()).digest()
+
+    @property
+    def surface(self) -> pygame.Surface:
+        return self.__surface
+
+    @property
+    def sprite_manager(self) -> SpriteManager:
+        return self.__sprite_manager
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    @property
+    def frame(self) -> int:
+        return len(self.__input_log.frames)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counts of what's happened in the game: bat hits, the number of bat hits before each point (the rallies), and how
+        many of each cat type have spawned and been hit.
+        """
+        return self.__stats
+
+    @property
+    def input_latency(self) -> Dict[str, float]:
+        """
+        Percentiles of the time from handling a control key's event to presenting the first frame that it's had an
+        effect on, over the last 10,000 of them. pygame doesn't say when SDL queued an event, so time spent in the queue
+        before the frame handled it isn't included.
+        """
+        samples = np.array(self.__input_latency)
+        if not len(samples):
+            return {"count": 0}
+
+        return {"count": len(samples), **{f"p{percent}_ms": float(np.percentile(samples, percent, method="inverted_cdf"))
+                                          for percent in (50, 95, 99)}, "max_ms": float(samples.max())}
+
+    @property
+    def thread_times(self) -> Dict[str, float]:
+        """
+        The mean milliseconds per frame spent simulating, and spent on the main thread handling events, drawing and
+        presenting, over the last 10,000 frames. On one thread a frame takes about as long as both together, and threaded
+        about as long as the longer of the two, as far as Python lets the threads overlap.
+        """
+        return {f"{name}_ms": sum(times) / len(times) if times else 0.0 for name, times in self.__thread_times.items()}
+
+    @property
+    def capture(self) -> Optional[FrameCapture]:
+        return self.__capture
+
+    @property
+    def seed(self) -> int:
+        return self.__seed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NU Game Jam 2024 pong, with cats")
+    parser.add_argument("--seed", type=int, help="seed the game's randomness")
+    parser.add_argument("--record", metavar="FILE", help="record the game to a file, to be replayed later")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recording headless, as fast as possible")
+    parser.add_argument("--build-atlas", action="store_true", help=f"pack every image into {ATLAS_PATH}, which is "
+                                                                      "loaded instead of the images from then on")
+    parser.add_argument("--profile", metavar="FILE", help="time every phase of every frame, and write the timings to a "
+                                                          "Chrome trace (.json) or CSV file when the game ends")
+    parser.add_argument("--resolution", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        help=f"the size to draw the game at, {INTERNAL_RESOLUTION[0]} {INTERNAL_RESOLUTION[1]} by default")
+    parser.add_argument("--native", action="store_true", help="draw at the display's own resolution instead of "
+                                                              "scaling the game up to fill it")
+    parser.add_argument("--bot", type=int, choices=[1, 2], action="append", default=[],
+                        help="let a bot play for this player, which can be given twice")
+    parser.add_argument("--threaded", action="store_true", help="simulate each frame on its own thread while the one "
+                                                                "before it is drawn")
+    parser.add_argument("--capture", metavar="FILE", help="stream every frame to a video through ffmpeg, or to a file "
+                                                          "of raw frames if it doesn't end in "
+                                                          f"{', '.join(FrameCapture.VIDEO_EXTENSIONS)}")
+    parser.add_argument("--no-trails", action="store_true", help="don't draw trails behind the balls")
+    args = parser.parse_args()
+
+    if args.build_atlas:
+        AssetManager.build_atlas(sorted([os.path.join("Graphics", name).replace(os.sep, "/")
+                                         for name in os.listdir("Graphics") if name.endswith(".png")]))
+        return
+
+    game = Game(resolution=args.resolution and tuple(args.resolution), seed=args.seed, record=args.record,
+                replay=args.replay, profile=args.profile, native=args.native, threaded=args.threaded,
+                capture=args.capture, trails=not args.no_trails)
+    for player in args.bot:
+        game.sprite_manager.object_pool[f"Player{player}"][0].controller = InterceptBot()
+
+    start = time.perf_counter()
     game.run()
+
+    latency = game.input_latency
+    if latency["count"]:
+        print(f"Input to screen over {latency['count']} key presses and releases: {latency['p50_ms']:.1f} ms median, "
+              f"{latency['p95_ms']:.1f} ms p95, {latency['p99_ms']:.1f} ms p99, {latency['max_ms']:.1f} ms max")
+
+    if SoundManager().plays or SoundManager().dropped:  # headless games and replays have no sound
+        print(f"Played {SoundManager().plays} sounds, and dropped {SoundManager().dropped} with every voice busy")
+
+    if game.capture is not None:
+        stats = game.capture.stats
+        print(f"Captured {stats['written']} frames to {game.capture.description}: {stats['dropped']} dropped, "
+              f"{stats['stalls']} waits for the writer ({stats['stall_ms']:.0f} ms), "
+              f"{stats['capture_ms']:.3f} ms per frame in the game loop ({stats['capture_max_ms']:.3f} ms max)"
+              + (f". Stopped writing after: {stats['error']}" if stats["error"] else ""))
+
+    if args.replay:
+        elapsed = time.perf_counter() - start
+        pool = game.sprite_manager.object_pool
+        print(f"Replayed {game.frame} frames in {elapsed:.2f}s, "
+              f"{game.frame * PHYSICS_STEP_MS / 1000 / max(elapsed, 1e-9):.1f}x real time. "
+              f"Score {pool['Player1'][0].score}-{pool['Player2'][0].score}, "
+              f"state {'matches' if game.state_digest() == InputLog.load(args.replay).digest else 'DIFFERS FROM'} the recording.")
+
+
+if __name__ == "__main__":
+    main()
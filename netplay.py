@@ -0,0 +1,597 @@
+"""
+Networked two-player mode over UDP.
+
+The server owns the game: it runs the simulation headless, takes each client's controls for their own bat, and sends
+every client a snapshot of the game each frame. Snapshots are delta compressed against the last snapshot the client
+acknowledged, so they only cost as much as what's changed. Clients predict their own bat from their controls, so it
+moves straight away, and correct it when the server's snapshots catch up.
+
+A shim can add latency, jitter and packet loss to everything a process sends, so the whole thing can be tried out on
+localhost. Run from the repository root:
+
+    python netplay.py server [--port 7777]
+    python netplay.py client [--host 127.0.0.1] [--port 7777] [--latency 40] [--loss 0.05]
+    python netplay.py local [--seconds 20] [--latency 40] [--jitter 10] [--loss 0.05]
+
+where local plays a server and two bot clients against each other in one process, and reports on the connection.
+"""
+from typing import *
+from random import Random
+import asyncio
+import argparse
+import struct
+import time
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import pygame
+
+from main import Game, InputLog, Player, AssetManager, AnimationCache, TextCache, Cat, CAT_TYPES, PHYSICS_STEP_MS, WHITE
+
+MAGIC = b"NUGN"
+HEADER = struct.Struct("<4sB")  # magic, kind of packet
+HELLO, WELCOME, INPUT, SNAPSHOT = range(4)
+WELCOME_BODY = struct.Struct("<BHHH")  # player number, screen width and height, number of balls
+INPUT_BODY = struct.Struct("<IIIB")  # last snapshot received, sequence number, client time in ms, number of controls
+SNAPSHOT_BODY = struct.Struct("<IIII")  # frame, frame it's a delta against, last controls applied, echoed client time
+NO_BASE = 0xFFFFFFFF  # the base frame of a full snapshot
+HISTORY = 64  # snapshots kept by both ends, to be deltas against
+REDUNDANT_INPUTS = 8  # controls resent in every input packet, so a lost packet doesn't lose any
+
+# --- the layout of a snapshot, as a flat array of ints --- #
+SCORE_1, SCORE_2, COUNTDOWN, BAT_1, BAT_2 = range(5)
+BALL_FIELDS = 5  # in play, x, y, x direction, y direction
+CAT_FIELDS = 6  # state, x, y, rotation, scaled width, scaled height
+CATS_PER_TYPE = 5
+COUNTDOWN_MESSAGES = ("", "3", "2", "1", "GO!")
+PLAYER_CONTROLS = {1: (InputLog.W, InputLog.S), 2: (InputLog.UP, InputLog.DOWN)}  # each player's up and down
+
+
+def capture(game: Game) -> np.ndarray:
+    """
+    Takes a snapshot of everything a client needs to draw the game.
+    :param Game game: The game to snapshot
+    :return: np.ndarray
+    """
+    pool = game.sprite_manager.object_pool
+    message = pool["Text"][1].message
+    state = [pool["Player1"][0].score, pool["Player2"][0].score,
+             COUNTDOWN_MESSAGES.index(message) if message in COUNTDOWN_MESSAGES else 0,
+             pool["Player1"][0].rect.top, pool["Player2"][0].rect.top]
+
+    in_play = set(game.sprite_manager.active("Ball"))
+    for ball in pool["Ball"]:
+        state += [ball in in_play, ball.rect.left, ball.rect.top, *ball.direction]
+
+    for cat_type in CAT_TYPES:
+        for cat in pool[f"{cat_type} Cat"]:
+            state += [cat.state, cat.rect.left, cat.rect.top, cat.rotation % 360, *cat.scale_size]
+
+    return np.array(state, np.int64)
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    """
+    Appends a non-negative int, 7 bits per byte.
+    :param bytearray out: Where to write the int
+    :param int value: The int to write
+    :return: None
+    """
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """
+    Reads an int written by write_varint.
+    :param bytes data: What to read from
+    :param int offset: Where the int starts
+    :return: Tuple[int, int], the int and where the next one starts
+    """
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+
+def encode_delta(state: np.ndarray, base: np.ndarray) -> bytes:
+    """
+    Encodes the fields of a snapshot that differ from a base, as the gap since the last changed field, followed by the
+    change. Both are varints, with the change zigzag encoded so that small negative changes stay small too.
+    :param np.ndarray state: The snapshot to encode
+    :param np.ndarray base: The snapshot the client already has, or zeros for a full snapshot
+    :return: bytes
+    """
+    out = bytearray()
+    last = -1
+    changed = np.flatnonzero(state != base)
+    for index, change in zip(changed.tolist(), (state[changed] - base[changed]).tolist()):
+        write_varint(out, index - last - 1)
+        write_varint(out, change << 1 if change >= 0 else (-change << 1) - 1)
+        last = index
+
+    return bytes(out)
+
+
+def decode_delta(data: bytes, offset: int, base: np.ndarray) -> np.ndarray:
+    """
+    Applies a delta written by encode_delta to its base.
+    :param bytes data: The packet holding the delta
+    :param int offset: Where the delta starts
+    :param np.ndarray base: The snapshot the delta is against
+    :return: np.ndarray, the new snapshot
+    """
+    state = base.copy()
+    index = -1
+    while offset < len(data):
+        gap, offset = read_varint(data, offset)
+        change, offset = read_varint(data, offset)
+        index += gap + 1
+        state[index] += change >> 1 if not change & 1 else -((change + 1) >> 1)
+
+    return state
+
+
+class NetStats:
+    """
+    Counts what a connection has sent and received.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.packets_sent = self.packets_received = 0
+        self.bytes_sent = self.bytes_received = 0
+        self.dropped = 0  # by the shim
+        self.full_snapshots = self.delta_snapshots = 0
+        self.round_trips: List[float] = []  # ms
+        self.corrections: List[int] = []  # how far the predicted bat was from where the server put it, in pixels
+
+    def summary(self) -> str:
+        """
+        Gets the rates and averages of the stats, in a line.
+        :return: str
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        line = (f"sent {self.bytes_sent / elapsed / 1024:.1f} KiB/s in {self.packets_sent / elapsed:.0f} packets/s, "
+                f"received {self.bytes_received / elapsed / 1024:.1f} KiB/s, {self.dropped} dropped by the shim")
+        if self.full_snapshots or self.delta_snapshots:
+            line += f", {self.full_snapshots} full and {self.delta_snapshots} delta snapshots"
+
+        if self.round_trips:
+            trips = sorted(self.round_trips)
+            line += f", round trip {sum(trips) / len(trips):.1f} ms mean / {trips[int(len(trips) * 0.95)]:.1f} ms p95"
+
+        if self.corrections:
+            line += (f", bat corrected on {sum([bool(c) for c in self.corrections]) / len(self.corrections):.0%} "
+                     f"of snapshots by {max(self.corrections)} px at most")
+
+        return line
+
+
+class Link(asyncio.DatagramProtocol):
+    """
+    One end of the UDP connection. Everything it sends can be put through a shim, which delays packets by a latency
+    and a random jitter, and drops a fraction of them.
+    """
+    def __init__(self, on_packet: Callable[[int, bytes, Tuple[str, int]], None], latency_ms: float = 0,
+                 jitter_ms: float = 0, loss: float = 0, seed: int = None):
+        self.__on_packet = on_packet
+        self.__latency = latency_ms / 1000
+        self.__jitter = jitter_ms / 1000
+        self.__loss = loss
+        self.__rng = Random(seed)
+        self.__transport: Optional[asyncio.DatagramTransport] = None
+        self.stats = NetStats()
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.__transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if len(data) < HEADER.size:
+            return
+
+        magic, kind = HEADER.unpack_from(data)
+        if magic == MAGIC:
+            self.stats.packets_received += 1
+            self.stats.bytes_received += len(data)
+            self.__on_packet(kind, data, addr)
+
+    def send(self, kind: int, body: bytes, addr: Optional[Tuple[str, int]] = None) -> None:
+        """
+        Sends a packet, through the shim.
+        :param int kind: The kind of packet
+        :param bytes body: Everything after the header
+        :param Tuple[str, int] addr: Where to send it, or None if the link is connected
+        :return: None
+        """
+        packet = HEADER.pack(MAGIC, kind) + body
+        self.stats.packets_sent += 1
+        self.stats.bytes_sent += len(packet)
+        if self.__rng.random() < self.__loss:
+            self.stats.dropped += 1
+
+        elif self.__latency or self.__jitter:
+            delay = max(0.0, self.__latency + self.__rng.uniform(-self.__jitter, self.__jitter))
+            asyncio.get_running_loop().call_later(delay, self.__send_later, packet, addr)
+
+        else:
+            self.__transport.sendto(packet, addr)
+
+    def __send_later(self, packet: bytes, addr: Optional[Tuple[str, int]]) -> None:
+        if not self.__transport.is_closing():  # the link may have closed while the packet was delayed
+            self.__transport.sendto(packet, addr)
+
+    def close(self) -> None:
+        self.__transport.close()
+
+
+class Server:
+    """
+    Runs the game, and keeps each client up to date with it.
+    """
+    def __init__(self, seed: int = None, ball_count: int = 15):
+        self.__clients: Dict[Tuple[str, int], Dict[str, Any]] = {}  # address: player, controls and acknowledgements
+        self.__game = Game(headless=True, fps=0, frame_ms=PHYSICS_STEP_MS, seed=seed, ball_count=ball_count,
+                           controls=self.__controls)
+        self.__history: Dict[int, np.ndarray] = {}
+        self.link: Optional[Link] = None
+
+    def on_packet(self, kind: int, data: bytes, addr: Tuple[str, int]) -> None:
+        """
+        Handles a packet from a client.
+        :param int kind: The kind of packet
+        :param bytes data: The packet
+        :param Tuple[str, int] addr: The client's address
+        :return: None
+        """
+        if kind == HELLO:
+            if addr not in self.__clients and len(self.__clients) < 2:
+                self.__clients[addr] = {"player": len(self.__clients) + 1, "controls": {}, "applied": 0, "last": 0,
+                                        "ack": NO_BASE, "time": 0}
+
+            if addr in self.__clients:  # hellos are repeated until welcomed, so welcome every one
+                width, height = self.__game.surface.get_size()
+                self.link.send(WELCOME, WELCOME_BODY.pack(self.__clients[addr]["player"], width, height,
+                                                          len(self.__game.sprite_manager.object_pool["Ball"])), addr)
+
+        elif kind == INPUT and addr in self.__clients:
+            client = self.__clients[addr]
+            ack, sequence, client_time, count = INPUT_BODY.unpack_from(data, HEADER.size)
+            if ack != NO_BASE and (client["ack"] == NO_BASE or ack > client["ack"]):
+                client["ack"] = ack
+
+            client["time"] = client_time
+            for i, controls in enumerate(data[HEADER.size + INPUT_BODY.size:HEADER.size + INPUT_BODY.size + count]):
+                if sequence - count + 1 + i > client["applied"]:
+                    client["controls"][sequence - count + 1 + i] = controls
+
+    def __controls(self, game: Game) -> int:
+        """
+        Applies each client's next controls to their own bat, or repeats their last ones if the next haven't arrived.
+        :param Game game: The game being played
+        :return: int, the controls for both bats
+        """
+        controls = 0
+        for client in self.__clients.values():
+            pending = client["controls"]
+            if pending and max(pending) - client["applied"] > REDUNDANT_INPUTS:  # too far behind, so skip ahead
+                client["applied"] = max(pending) - 1
+
+            if client["applied"] + 1 in pending:
+                client["applied"] += 1
+                client["last"] = pending[client["applied"]]
+
+            for sequence in [sequence for sequence in pending if sequence <= client["applied"]]:
+                del pending[sequence]
+
+            controls |= client["last"] & sum(PLAYER_CONTROLS[client["player"]])
+
+        return controls
+
+    def __broadcast(self) -> None:
+        """
+        Sends every client a snapshot of this frame, as a delta against the last one they acknowledged if possible.
+        :return: None
+        """
+        frame = self.__game.frame
+        state = capture(self.__game)
+        self.__history[frame] = state
+        self.__history.pop(frame - HISTORY, None)
+        for addr, client in self.__clients.items():
+            base = client["ack"] if client["ack"] in self.__history else NO_BASE
+            delta = encode_delta(state, self.__history[base] if base != NO_BASE else np.zeros_like(state))
+            self.link.send(SNAPSHOT, SNAPSHOT_BODY.pack(frame, base, client["applied"], client["time"]) + delta, addr)
+            if base == NO_BASE:
+                self.link.stats.full_snapshots += 1
+
+            else:
+                self.link.stats.delta_snapshots += 1
+
+    async def run(self, seconds: float = None) -> None:
+        """
+        Waits for two clients, then plays the game a frame every physics step.
+        :param float seconds: How long to play for, or forever if None
+        :return: None
+        """
+        while len(self.__clients) < 2:
+            await asyncio.sleep(0.05)
+
+        self.__game.start()
+        loop = asyncio.get_running_loop()
+        next_frame = started = loop.time()
+        while self.__game.running and (seconds is None or loop.time() - started < seconds):
+            self.__game.step()
+            self.__broadcast()
+            next_frame += PHYSICS_STEP_MS / 1000
+            await asyncio.sleep(max(0.0, next_frame - loop.time()))
+
+    @property
+    def game(self) -> Game:
+        return self.__game
+
+
+class Client:
+    """
+    Sends the controls for one bat to the server, and draws the snapshots it sends back, predicting where its own bat
+    is from the controls the server hasn't applied yet.
+    """
+    def __init__(self, render: bool = True, bot: bool = False):
+        self.__render = render
+        self.__bot = bot
+        self.__player = 0
+        self.__ball_count = 0
+        self.__size = (0, 0)
+        self.__snapshots: Dict[int, np.ndarray] = {}
+        self.__latest = NO_BASE
+        self.__sequence = 0
+        self.__pending: Dict[int, int] = {}  # controls the server hasn't applied yet, by sequence number
+        self.__predicted_y = 0
+        self.__predicting = False  # whether there's been a snapshot to predict from yet
+        self.__screen: Optional[pygame.Surface] = None
+        self.__bat_height = 0
+        self.__ball_height = 0
+        self.running = True
+        self.link: Optional[Link] = None
+
+    def on_packet(self, kind: int, data: bytes, addr: Tuple[str, int]) -> None:
+        """
+        Handles a packet from the server.
+        :param int kind: The kind of packet
+        :param bytes data: The packet
+        :param Tuple[str, int] addr: The server's address
+        :return: None
+        """
+        if kind == WELCOME and not self.__player:
+            self.__player, width, height, self.__ball_count = WELCOME_BODY.unpack_from(data, HEADER.size)
+            self.__size = (width, height)
+            if self.__render:
+                self.__screen = pygame.display.set_mode(self.__size, pygame.SCALED)  # scaled up on high-DPI displays
+                pygame.display.set_caption(f"Player {self.__player}")
+                AssetManager().reset(self.__screen)
+                AnimationCache().reset()
+
+        elif kind == SNAPSHOT and self.__player:
+            frame, base, applied, client_time = SNAPSHOT_BODY.unpack_from(data, HEADER.size)
+            if (self.__latest != NO_BASE and frame <= self.__latest) or (base != NO_BASE and base not in self.__snapshots):
+                return  # out of order, or against a snapshot that's been lost
+
+            length = 5 + self.__ball_count * BALL_FIELDS + len(CAT_TYPES) * CATS_PER_TYPE * CAT_FIELDS
+            state = decode_delta(data, HEADER.size + SNAPSHOT_BODY.size,
+                                 self.__snapshots[base] if base != NO_BASE else np.zeros(length, np.int64))
+            if client_time:  # the server echoes the time of the last controls it received, once there are some
+                self.link.stats.round_trips.append((self.__now() - client_time) % 2 ** 32)
+            self.__snapshots[frame] = state
+            # lost snapshots leave gaps in the frames, so everything too old goes, not just the frame HISTORY back
+            for old in [old for old in self.__snapshots if old <= frame - HISTORY]:
+                del self.__snapshots[old]
+
+            self.__latest = frame
+            self.__reconcile(state, applied)
+
+    def __reconcile(self, state: np.ndarray, applied: int) -> None:
+        """
+        Puts the predicted bat where the server says it was, then re-applies the controls the server hasn't seen.
+        :param np.ndarray state: The server's latest snapshot
+        :param int applied: The last of this client's controls the server applied
+        :return: None
+        """
+        for sequence in [sequence for sequence in self.__pending if sequence <= applied]:
+            del self.__pending[sequence]
+
+        predicted_y = int(state[BAT_1 if self.__player == 1 else BAT_2])
+        for controls in self.__pending.values():
+            predicted_y = self.__move_bat(predicted_y, controls, state)
+
+        if self.__predicting:
+            self.link.stats.corrections.append(abs(predicted_y - self.__predicted_y))
+
+        self.__predicted_y = predicted_y
+        self.__predicting = True
+
+    def __move_bat(self, y: int, controls: int, state: np.ndarray) -> int:
+        """
+        Moves this client's bat the way the server will, for a single frame.
+        :param int y: Where the top of the bat is
+        :param int controls: The controls for the frame
+        :param np.ndarray state: The latest snapshot, since bats can't move during the countdown
+        :return: int, where the top of the bat will be
+        """
+        if state[COUNTDOWN]:
+            return y
+
+        up, down = PLAYER_CONTROLS[self.__player]
+        y += Player.MOVE_SPEED * (-bool(controls & up) + bool(controls & down))
+        return max(0, min(y, self.__size[1] - self.__bat_height))
+
+    def __read_controls(self, state: np.ndarray) -> int:
+        """
+        Reads this frame's controls, from the keyboard or from a bot that follows the nearest ball coming its way.
+        :param np.ndarray state: The latest snapshot
+        :return: int
+        """
+        up, down = PLAYER_CONTROLS[self.__player]
+        if self.__bot:
+            target = self.__size[1] // 2
+            direction, bat_x = (-1, 50) if self.__player == 1 else (1, self.__size[0] - 50)
+            balls = state[5:5 + self.__ball_count * BALL_FIELDS].reshape(-1, BALL_FIELDS)
+            coming = balls[(balls[:, 0] == 1) & (balls[:, 3] == direction)]
+            if len(coming):
+                target = int(coming[np.argmin(np.abs(coming[:, 1] - bat_x)), 2]) + self.__ball_height // 2
+
+            centre = self.__predicted_y + self.__bat_height // 2
+            return up if target < centre - Player.MOVE_SPEED else down if target > centre + Player.MOVE_SPEED else 0
+
+        keys = pygame.key.get_pressed()
+        return ((up if keys[pygame.K_w] or keys[pygame.K_UP] else 0) |
+                (down if keys[pygame.K_s] or keys[pygame.K_DOWN] else 0))
+
+    def __draw(self, state: np.ndarray) -> None:
+        """
+        Draws a snapshot, with this client's bat where it's been predicted to be.
+        :param np.ndarray state: The snapshot to draw
+        :return: None
+        """
+        screen = self.__screen
+        screen.fill(WHITE)
+        bat = AssetManager().image("Graphics/bat.png", Player.ROTATION)
+        for player, x in ((1, 50), (2, self.__size[0] - 50 - bat.get_width())):
+            screen.blit(bat, (x, self.__predicted_y if player == self.__player else int(state[BAT_1 + player - 1])))
+
+        cats = state[5 + self.__ball_count * BALL_FIELDS:].reshape(-1, CAT_FIELDS)
+        for i, (cat_state, x, y, rotation, width, height) in enumerate(cats.tolist()):
+            if cat_state != Cat.HIDDEN:
+                cat_type = f"{CAT_TYPES[i // CATS_PER_TYPE]} Cat"
+                image = AssetManager().image(f"Graphics/{cat_type}.png")
+                frame = (AnimationCache().rotated(cat_type, image, rotation) if rotation else
+                         AnimationCache().scaled(cat_type, image, (width, height)))
+                screen.blit(frame, (x, y))
+
+        ball = AssetManager().image("Graphics/ball.png")
+        balls = state[5:5 + self.__ball_count * BALL_FIELDS].reshape(-1, BALL_FIELDS)
+        screen.blits([(ball, (x, y)) for in_play, x, y, _, _ in balls.tolist() if in_play], False)
+
+        font = TextCache()
+        for score, x in ((state[SCORE_1], self.__size[0] // 4), (state[SCORE_2], self.__size[0] // 4 * 3)):
+            text = font.render(screen, "Fonts/Arcadepix.TTF", f"{score:02d}", 128, (184, 184, 184) if state[COUNTDOWN] else (0, 0, 0))
+            screen.blit(text, text.get_rect(midtop=(x, 200)))
+
+        if state[COUNTDOWN]:
+            text = font.render(screen, "Fonts/Arcadepix.TTF", COUNTDOWN_MESSAGES[state[COUNTDOWN]], 256, (0, 0, 0))
+            screen.blit(text, text.get_rect(midtop=(self.__size[0] // 2, 100)))
+
+        pygame.display.flip()
+
+    @staticmethod
+    def __now() -> int:
+        return int(time.perf_counter() * 1000) % 2 ** 32
+
+    async def run(self, seconds: float = None) -> None:
+        """
+        Joins the server, then sends controls and draws the game every frame.
+        :param float seconds: How long to play for, or until the window is closed if None
+        :return: None
+        """
+        while not self.__player:
+            self.link.send(HELLO, b"")
+            await asyncio.sleep(0.25)
+
+        self.__bat_height = pygame.image.load("Graphics/bat.png").get_width()  # the bat is turned on its side
+        self.__ball_height = pygame.image.load("Graphics/ball.png").get_height()
+        loop = asyncio.get_running_loop()
+        next_frame = started = loop.time()
+        while self.running and (seconds is None or loop.time() - started < seconds):
+            if self.__latest != NO_BASE:
+                state = self.__snapshots[self.__latest]
+                self.__sequence += 1
+                controls = self.__read_controls(state)
+                self.__pending[self.__sequence] = controls
+                self.__predicted_y = self.__move_bat(self.__predicted_y, controls, state)
+                recent = [self.__pending.get(sequence, 0) for sequence in
+                          range(max(1, self.__sequence - REDUNDANT_INPUTS + 1), self.__sequence + 1)]
+                self.link.send(INPUT, INPUT_BODY.pack(self.__latest, self.__sequence, self.__now(), len(recent))
+                               + bytes(recent))
+                if self.__render:
+                    self.__draw(state)
+
+            if self.__render:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                        self.running = False
+
+            next_frame += PHYSICS_STEP_MS / 1000
+            await asyncio.sleep(max(0.0, next_frame - loop.time()))
+
+
+async def serve(host: str, port: int, seconds: float = None, **shim) -> Server:
+    server = Server()
+    _, server.link = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: Link(server.on_packet, **shim), local_addr=(host, port))
+    await server.run(seconds)
+    server.link.close()
+    return server
+
+
+async def connect(host: str, port: int, seconds: float = None, render: bool = True, bot: bool = False,
+                  **shim) -> Client:
+    client = Client(render, bot)
+    _, client.link = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: Link(client.on_packet, **shim), remote_addr=(host, port))
+    await client.run(seconds)
+    client.link.close()
+    return client
+
+
+async def play_local(port: int, seconds: float, **shim) -> None:
+    """
+    Plays a server against two bot clients on localhost, all through the shim, then reports on their connections.
+    :param int port: The port to serve on
+    :param float seconds: How long to play for
+    :return: None
+    """
+    server_task = asyncio.create_task(serve("127.0.0.1", port, seconds, **shim))
+    await asyncio.sleep(0.1)
+    clients = await asyncio.gather(*[connect("127.0.0.1", port, seconds, False, True, **shim, seed=i)
+                                     for i in range(1, 3)])
+    server = await server_task
+    pool = server.game.sprite_manager.object_pool
+    print(f"{server.game.frame} frames played, score {pool['Player1'][0].score}-{pool['Player2'][0].score}")
+    print(f"server:   {server.link.stats.summary()}")
+    for i, client in enumerate(clients, 1):
+        print(f"client {i}: {client.link.stats.summary()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Networked two-player mode over UDP")
+    parser.add_argument("mode", choices=["server", "client", "local"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--seconds", type=float, help="how long to play for, 20 by default when local")
+    parser.add_argument("--latency", type=float, default=0, help="ms of delay the shim adds to every packet sent")
+    parser.add_argument("--jitter", type=float, default=0, help="ms the shim's delay varies by, either way")
+    parser.add_argument("--loss", type=float, default=0, help="fraction of packets sent that the shim drops")
+    parser.add_argument("--bot", action="store_true", help="let a bot play for this client")
+    args = parser.parse_args()
+    shim = {"latency_ms": args.latency, "jitter_ms": args.jitter, "loss": args.loss}
+
+    if args.mode == "server":
+        server = asyncio.run(serve(args.host, args.port, args.seconds, **shim))
+        print(f"server: {server.link.stats.summary()}")
+
+    elif args.mode == "client":
+        pygame.init()
+        client = asyncio.run(connect(args.host, args.port, args.seconds, True, args.bot, **shim))
+        print(f"client: {client.link.stats.summary()}")
+
+    else:
+        asyncio.run(play_local(args.port, args.seconds or 20, **shim))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Headless self-play for balancing the game.
+
+Plays many games between bots across a pool of processes, one game per seed and config, and streams back statistics
+about how each config plays: rally lengths, the spread of scores, how often each power-up gets hit, and how fast the
+games were simulated. Run from the repository root:
+
+    python selfplay.py [--games 64] [--configs configs.json] [--json results.json]
+
+where configs.json holds a list of configs like DEFAULT_CONFIG, with any of its keys overridden.
+"""
+from typing import *
+from collections import Counter
+import multiprocessing
+import contextlib
+import argparse
+import json
+import io
+import os
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # otherwise every process says hello
+# SDL turns SIGTERM into a quit event by default, which would leave the pool waiting forever for its processes to stop
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+from main import Game, Ball, Player, InterceptBot, CAT_TYPES, CAT_WEIGHTS, PHYSICS_STEP_MS
+
+DEFAULT_CONFIG = {
+    "name": "default",
+    "cat_weights": CAT_WEIGHTS,
+    "serve_speed": Ball.SERVE_SPEED,
+    "bat_speed": Player.MOVE_SPEED,
+    "reaction_ms": 100,  # how long the bots take to act on where they see the balls going
+    "aim_error": 12,  # the standard deviation, in pixels, of how far the bots misjudge where balls will be
+    "target_score": 5,  # the game ends when either player gets this many points
+    "max_frames": 60 * 60 * 5,  # or after this many frames, whichever is first
+}
+
+
+def play_game(job: Tuple[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Plays a single game between two bots, headless and as fast as possible.
+    :param Tuple[int, Dict[str, Any]] job: The seed of the game, and its config
+    :return: Dict[str, Any], the results of the game
+    """
+    seed, config = job
+    # the speeds are read when balls and bats are made, and each process only plays one game at a time
+    Ball.SERVE_SPEED = config["serve_speed"]
+    Player.MOVE_SPEED = config["bat_speed"]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the game prints whenever a cat is hit
+        game = Game(headless=True, fps=0, frame_ms=PHYSICS_STEP_MS, seed=seed, cat_weights=config["cat_weights"])
+        bats = [game.sprite_manager.object_pool[f"Player{i}"][0] for i in range(1, 3)]
+        for i, bat in enumerate(bats):
+            bat.controller = InterceptBot(config["reaction_ms"], config["aim_error"], seed=seed * 2 + i)
+
+        game.start()
+        while game.running and game.frame < config["max_frames"] and \
+                max([bat.score for bat in bats]) < config["target_score"]:
+            game.step()
+
+    return {
+        "config": config["name"],
+        "seed": seed,
+        "frames": game.frame,
+        "seconds": time.perf_counter() - start,
+        "score": (bats[0].score, bats[1].score),
+        "bat_hits": game.stats["bat_hits"],
+        "rallies": game.stats["rallies"],
+        "cat_spawns": game.stats["cat_spawns"],
+        "cat_hits": game.stats["cat_hits"],
+    }
+
+
+def summarise(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """
+    Aggregates the results of every game played with a config.
+    :param List[Dict[str, Any]] results: The results of the games
+    :param float elapsed: The wall-clock seconds the whole run has taken
+    :return: Dict[str, Any]
+    """
+    rallies = sorted([rally for result in results for rally in result["rallies"]])
+    spawns = {f"{cat_type} Cat": sum([result["cat_spawns"][f"{cat_type} Cat"] for result in results]) for cat_type in CAT_TYPES}
+    hits = {f"{cat_type} Cat": sum([result["cat_hits"][f"{cat_type} Cat"] for result in results]) for cat_type in CAT_TYPES}
+    frames = sum([result["frames"] for result in results])
+    return {
+        "config": results[0]["config"],
+        "games": len(results),
+        "frames": frames,
+        "frames_per_second": frames / max(sum([result["seconds"] for result in results]), 1e-9),  # per process
+        "games_per_second": len(results) / max(elapsed, 1e-9),
+        "points": len(rallies),
+        "rally_mean": sum(rallies) / max(len(rallies), 1),
+        "rally_median": rallies[len(rallies) // 2] if rallies else 0,
+        "rally_max": rallies[-1] if rallies else 0,
+        "scores": {f"{p1}-{p2}": count for (p1, p2), count in Counter([tuple(result["score"]) for result in results]).most_common()},
+        "player1_win_rate": sum([result["score"][0] > result["score"][1] for result in results]) / len(results),
+        "cat_spawns": spawns,
+        # every spawn either shows a cat or moves one that's on screen, and a cat goes away on its first hit, so this is
+        # the share of spawns that got hit before the cat moved or the round ended
+        "cat_hit_rate": {cat: hits[cat] / spawns[cat] if spawns[cat] else 0.0 for cat in spawns},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless bot self-play for balancing the game")
+    parser.add_argument("--games", type=int, default=64, help="games to play per config")
+    parser.add_argument("--configs", help="a JSON file holding a list of configs, each overriding DEFAULT_CONFIG")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="processes to play games in")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first game, each game after adds 1")
+    parser.add_argument("--json", help="also write the summaries to this file")
+    args = parser.parse_args()
+
+    overrides = [{}]
+    if args.configs:
+        with open(args.configs) as file:
+            overrides = json.load(file)
+
+    configs = [{**DEFAULT_CONFIG, "name": f"config {i}", **override} for i, override in enumerate(overrides)]
+    jobs = [(args.seed + game, config) for config in configs for game in range(args.games)]
+
+    start = time.perf_counter()
+    results: Dict[str, List[Dict[str, Any]]] = {config["name"]: [] for config in configs}
+    # spawned processes start with their own pygame, rather than a copy of this one's display state
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        for done, result in enumerate(pool.imap_unordered(play_game, jobs), 1):
+            results[result["config"]].append(result)
+            elapsed = time.perf_counter() - start
+            print(f"\r{done}/{len(jobs)} games, {done / elapsed:.1f} games/s", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print()
+    summaries = [summarise(config_results, elapsed) for config_results in results.values() if config_results]
+    for summary in summaries:
+        print(f"\n{summary['config']}: {summary['games']} games, {summary['frames']} frames "
+              f"({summary['frames_per_second']:.0f} frames/s per process)")
+        print(f"  rallies: mean {summary['rally_mean']:.1f}, median {summary['rally_median']}, "
+              f"max {summary['rally_max']} bat hits over {summary['points']} points")
+        print(f"  player 1 wins {summary['player1_win_rate']:.0%}, most common scores: "
+              + ", ".join([f"{score} x{count}" for score, count in list(summary["scores"].items())[:5]]))
+        print("  power-up spawns hit: " + ", ".join([f"{cat} {rate:.0%} of {summary['cat_spawns'][cat]}"
+                                                     for cat, rate in summary["cat_hit_rate"].items()]))
+
+    print(f"\n{len(jobs)} games in {elapsed:.1f}s on {args.processes} processes, {len(jobs) / elapsed:.1f} games/s")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(summaries, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()